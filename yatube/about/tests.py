@@ -2,6 +2,8 @@ from django.test import TestCase
 from http import HTTPStatus
 from django.urls import reverse
 
+from core.query_budget import QueryBudgetMixin
+
 
 class StaticPagesURLTests(TestCase):
     def test_available_pages_for_anonymous(self):
@@ -45,3 +47,20 @@ class StaticPagesURLTests(TestCase):
             with self.subTest(name=name):
                 response = self.client.get(reverse(name))
                 self.assertTemplateUsed(response, template)
+
+
+class StaticPagesQueryBudgetTest(QueryBudgetMixin, TestCase):
+    budgets = {
+        'about:author': 0,
+        'about:tech': 0,
+    }
+
+    def test_every_route_has_budget(self):
+        """У каждого маршрута about есть бюджет запросов."""
+        self.assertBudgetsCoverRoutes('about.urls', self.budgets)
+
+    def test_budgets(self):
+        """Статические страницы не обращаются к базе."""
+        for name, budget in self.budgets.items():
+            with self.subTest(name=name):
+                self.assertPageWithinBudget(self.client, reverse(name), budget)
@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .sqlite import apply_pragmas
+        connection_created.connect(apply_pragmas)
+        if settings.SLOW_QUERY_THRESHOLD_MS is not None:
+            from .slow_queries import install_wrapper
+            connection_created.connect(install_wrapper)
+        if settings.TEMPLATE_CACHE:
+            from .templating import warm_up
+            warm_up()
@@ -0,0 +1,242 @@
+"""Замеры SQL и рендеринга шаблонов в пределах одного запроса."""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.template.base import Template
+
+_state = threading.local()
+
+
+class RequestRecorder:
+    """Копит время SQL и шаблонов текущего запроса."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        # Имя шаблона -> [число рендеров, время с вложенными, собственное].
+        self.templates = defaultdict(lambda: [0, 0.0, 0.0])
+        self.template_stack = []
+        # Время уже отрендеренных вложенных шаблонов для каждого уровня стека.
+        self.children_time = []
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - started
+
+
+def current():
+    """Recorder текущего потока или None вне замеряемого запроса."""
+    return getattr(_state, 'recorder', None)
+
+
+def start():
+    _state.recorder = RequestRecorder()
+    return _state.recorder
+
+
+def stop():
+    _state.recorder = None
+
+
+def template_stack():
+    """Шаблоны, которые рендерятся прямо сейчас, от внешнего к внутреннему."""
+    recorder = current()
+    return list(recorder.template_stack) if recorder else []
+
+
+def _timed_render(original):
+    def render(self, context):
+        recorder = current()
+        if recorder is None:
+            return original(self, context)
+        name = self.origin.template_name or self.origin.name
+        recorder.template_stack.append(name)
+        recorder.children_time.append(0.0)
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            recorder.template_stack.pop()
+            children = recorder.children_time.pop()
+            stats = recorder.templates[name]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed - children
+            if recorder.children_time:
+                recorder.children_time[-1] += elapsed
+            else:
+                recorder.template_time += elapsed
+    render.instrumented = True
+    return render
+
+
+def install():
+    """Оборачивает Template._render: его вызывают и include, и extends."""
+    if not getattr(Template._render, 'instrumented', False):
+        Template._render = _timed_render(Template._render)
+
+
+# Границы корзин гистограммы, мс; последняя корзина — всё, что дольше.
+HISTOGRAM_BOUNDS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class ViewHistograms:
+    """Скользящие окна длительностей запросов по именам вьюх.
+
+    Для каждой вьюхи хранится не больше window последних замеров,
+    старые вытесняются, поэтому картина отражает недавнюю нагрузку.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, view, total_ms, sql_count):
+        with self.lock:
+            if view not in self.samples:
+                self.samples[view] = deque(maxlen=self.window)
+            self.samples[view].append((round(total_ms, 3), sql_count))
+
+    def snapshot(self):
+        with self.lock:
+            return {view: list(samples)
+                    for view, samples in self.samples.items()}
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+
+def summarize(samples):
+    """Перцентили, среднее число запросов и корзины гистограммы."""
+    timings = sorted(total for total, _ in samples)
+    buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for total in timings:
+        buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, total)] += 1
+
+    def rank(share):
+        index = max(int(round(share * len(timings))) - 1, 0)
+        return timings[min(index, len(timings) - 1)]
+
+    return {
+        'count': len(timings),
+        'p50_ms': rank(0.50),
+        'p90_ms': rank(0.90),
+        'p99_ms': rank(0.99),
+        'max_ms': timings[-1],
+        'sql_mean': round(sum(sql for _, sql in samples) / len(samples), 2),
+        'buckets': buckets,
+    }
+
+
+histograms = ViewHistograms()
+
+
+class TemplateProfiles:
+    """Суммарное время рендеринга по шаблонам с запуска процесса."""
+
+    def __init__(self):
+        # Имя шаблона -> [рендеров, запросов, с вложенными, собственное], мс.
+        self.totals = defaultdict(lambda: [0, 0, 0.0, 0.0])
+        self.lock = threading.Lock()
+
+    def record(self, templates):
+        with self.lock:
+            for name, (count, inclusive, exclusive) in templates.items():
+                totals = self.totals[name]
+                totals[0] += count
+                totals[1] += 1
+                totals[2] += inclusive * 1000
+                totals[3] += exclusive * 1000
+
+    def snapshot(self):
+        with self.lock:
+            return {name: list(totals) for name, totals in self.totals.items()}
+
+    def clear(self):
+        with self.lock:
+            self.totals.clear()
+
+
+template_profiles = TemplateProfiles()
+
+
+def profile_rows(templates):
+    """Строки профиля запроса по убыванию собственного времени, мс."""
+    rows = [
+        {
+            'template': name,
+            'renders': count,
+            'inclusive_ms': round(inclusive * 1000, 3),
+            'exclusive_ms': round(exclusive * 1000, 3),
+        }
+        for name, (count, inclusive, exclusive) in templates.items()
+    ]
+    return sorted(rows, key=lambda row: row['exclusive_ms'], reverse=True)
+
+
+# Подкаталог PERFORMANCE_STATS_DIR с профилями шаблонов процессов.
+TEMPLATE_PROFILES_DIR = 'templates'
+
+
+def _dump(directory, snapshot):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as output:
+        json.dump(snapshot, output)
+    os.replace(temporary, path)
+
+
+def _load(directory, max_age=None):
+    oldest = time.time() - max_age if max_age else None
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            if oldest is not None and os.path.getmtime(path) < oldest:
+                # Живой процесс перезаписывает файл при каждом сбросе,
+                # а этот остался от завершённого или перезапущенного.
+                os.remove(path)
+                continue
+            with open(path) as source:
+                yield json.load(source)
+        except (OSError, ValueError):
+            continue
+
+
+def dump_histograms(directory):
+    """Сохраняет окна текущего процесса в отдельный файл по его pid."""
+    _dump(directory, histograms.snapshot())
+    profiles = template_profiles.snapshot()
+    if profiles:
+        _dump(os.path.join(directory, TEMPLATE_PROFILES_DIR), profiles)
+
+
+def load_histograms(directory, max_age=None):
+    """Объединяет окна, сохранённые процессами за последние max_age с."""
+    merged = defaultdict(list)
+    for snapshot in _load(directory, max_age):
+        for view, samples in snapshot.items():
+            merged[view].extend(samples)
+    return dict(merged)
+
+
+def load_template_profiles(directory, max_age=None):
+    """Складывает профили шаблонов процессов за последние max_age с."""
+    merged = defaultdict(lambda: [0, 0, 0.0, 0.0])
+    for snapshot in _load(
+            os.path.join(directory, TEMPLATE_PROFILES_DIR), max_age):
+        for name, totals in snapshot.items():
+            merged[name] = [a + b for a, b in zip(merged[name], totals)]
+    return dict(merged)
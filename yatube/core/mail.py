@@ -0,0 +1,158 @@
+"""Очередь исходящих писем с доставкой из фонового потока.
+
+QueuedEmailBackend принимает письма мгновенно, а поток доставки
+отправляет их пачками через бэкенд QUEUED_EMAIL_BACKEND, держа одно
+соединение открытым, пока в очереди есть письма. При завершении
+процесса очередь дописывается до конца (не дольше
+QUEUED_EMAIL_DRAIN_TIMEOUT секунд).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз пробовать отправить пачку, каждый раз с новым соединением.
+DELIVERY_ATTEMPTS = 2
+
+
+class MailQueue:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.connection = None
+        self.counters = Counter()
+
+    def put(self, messages):
+        queued = time.monotonic()
+        for message in messages:
+            self.queue.put((queued, message))
+        with self.lock:
+            self.counters['queued'] += len(messages)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='mail-queue', daemon=True)
+                self.thread.start()
+        return len(messages)
+
+    def next_batch(self):
+        """Ждёт первое письмо, затем добирает пачку за короткое окно."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + settings.QUEUED_EMAIL_BATCH_WAIT
+        while len(batch) < settings.QUEUED_EMAIL_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    batch.append(self.queue.get(timeout=timeout))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                self.deliver([message for _, message in batch])
+            finally:
+                now = time.monotonic()
+                with self.lock:
+                    self.counters['batches'] += 1
+                    self.counters['delay_ms'] += sum(
+                        (now - queued) * 1000 for queued, _ in batch)
+                if self.queue.empty():
+                    self.close()
+                for _ in batch:
+                    self.queue.task_done()
+
+    def deliver(self, messages):
+        for attempt in range(1, DELIVERY_ATTEMPTS + 1):
+            try:
+                if self.connection is None:
+                    self.connection = get_connection(
+                        settings.QUEUED_EMAIL_BACKEND, fail_silently=False)
+                    self.connection.open()
+                sent = self.connection.send_messages(messages) or 0
+            except Exception:
+                logger.exception(
+                    'Не удалось отправить %s писем, попытка %s',
+                    len(messages), attempt)
+                self.close()
+            else:
+                with self.lock:
+                    self.counters['sent'] += sent
+                    self.counters['failed'] += len(messages) - sent
+                return
+        with self.lock:
+            self.counters['failed'] += len(messages)
+
+    def close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.close()
+        except Exception:
+            logger.exception('Не удалось закрыть соединение почты')
+        self.connection = None
+
+    def flush(self, timeout=None):
+        """Ждёт доставки всех принятых писем; False, если не дождался."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = (None if deadline is None
+                             else deadline - time.monotonic())
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stats(self):
+        """Счётчики доставки с момента запуска процесса."""
+        with self.lock:
+            counters = dict(self.counters)
+        batches = counters.pop('batches', 0)
+        delay = counters.pop('delay_ms', 0)
+        delivered = counters.get('sent', 0) + counters.get('failed', 0)
+        return {
+            'queued': counters.get('queued', 0),
+            'sent': counters.get('sent', 0),
+            'failed': counters.get('failed', 0),
+            'pending': self.queue.unfinished_tasks,
+            'batches': batches,
+            'mean_batch': round(delivered / batches, 1) if batches else 0,
+            'mean_delay_ms': round(delay / delivered, 1) if delivered else 0,
+        }
+
+
+mail_queue = MailQueue()
+
+
+@atexit.register
+def _drain():
+    if (mail_queue.queue.unfinished_tasks
+            and not mail_queue.flush(settings.QUEUED_EMAIL_DRAIN_TIMEOUT)):
+        logger.error('При остановке не доставлено писем: %s',
+                     mail_queue.queue.unfinished_tasks)
+    stats = mail_queue.stats()
+    if stats['queued']:
+        # Логгер core.mail выведен в консоль в LOGGING.
+        logger.info('Почта: %s', stats)
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Бэкенд, который только ставит письма в очередь доставки."""
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        return mail_queue.put(list(email_messages))
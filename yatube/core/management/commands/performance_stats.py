@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.instrumentation import (HISTOGRAM_BOUNDS, load_histograms,
+                                  load_template_profiles, summarize)
+
+
+class Command(BaseCommand):
+    help = 'Показывает гистограммы времени ответа по вьюхам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', default=settings.PERFORMANCE_STATS_DIR,
+            help='Каталог с файлами гистограмм процессов')
+        parser.add_argument(
+            '--max-age', type=int, default=settings.PERFORMANCE_STATS_MAX_AGE,
+            help='Файлы процессов старше стольких секунд удаляются, 0 — '
+                 'учитывать все')
+        parser.add_argument(
+            '--buckets', action='store_true',
+            help='Показать распределение по корзинам')
+        parser.add_argument(
+            '--templates', action='store_true',
+            help='Показать профиль шаблонов (TEMPLATE_PROFILING)')
+
+    def handle(self, *args, **options):
+        if options['templates']:
+            self.show_templates(options['dir'], options['max_age'])
+            return
+        merged = load_histograms(options['dir'], options['max_age'])
+        if not merged:
+            self.stdout.write('Замеров пока нет')
+            return
+        labels = [f'<{bound}' for bound in HISTOGRAM_BOUNDS]
+        labels.append(f'>={HISTOGRAM_BOUNDS[-1]}')
+        rows = sorted(
+            ((view, summarize(samples)) for view, samples in merged.items()),
+            key=lambda row: row[1]['p90_ms'], reverse=True)
+        for view, summary in rows:
+            self.stdout.write(
+                f"{view}: n={summary['count']} p50={summary['p50_ms']}ms "
+                f"p90={summary['p90_ms']}ms p99={summary['p99_ms']}ms "
+                f"max={summary['max_ms']}ms sql={summary['sql_mean']}")
+            if options['buckets']:
+                self.stdout.write('    ' + ' '.join(
+                    f'{label}:{count}'
+                    for label, count in zip(labels, summary['buckets'])))
+
+    def show_templates(self, directory, max_age):
+        profiles = load_template_profiles(directory, max_age)
+        if not profiles:
+            self.stdout.write('Профилей шаблонов пока нет')
+            return
+        rows = sorted(profiles.items(), key=lambda row: row[1][3],
+                      reverse=True)
+        for name, (renders, requests, inclusive, exclusive) in rows:
+            self.stdout.write(
+                f'{name}: renders={renders} requests={requests} '
+                f'per_request={renders / requests:.1f} '
+                f'self={exclusive:.1f}ms total={inclusive:.1f}ms '
+                f'self_per_request={exclusive / requests:.2f}ms')
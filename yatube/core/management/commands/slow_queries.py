@@ -0,0 +1,50 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import read_entries
+
+SORT_KEYS = ('total', 'max', 'count')
+
+
+class Command(BaseCommand):
+    help = 'Сводит журнал медленных запросов по нормализованному SQL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Сколько худших запросов показать')
+        parser.add_argument(
+            '--sort', choices=SORT_KEYS, default='total',
+            help='Порядок: суммарное время, максимум или число вызовов')
+
+    def handle(self, *args, **options):
+        groups = {}
+        for entry in read_entries():
+            group = groups.setdefault(entry['fingerprint'], {
+                'normalized': entry['normalized'],
+                'count': 0,
+                'total': 0.0,
+                'max': 0.0,
+                'sources': Counter(),
+            })
+            group['count'] += 1
+            group['total'] += entry['duration_ms']
+            group['max'] = max(group['max'], entry['duration_ms'])
+            source = entry['stack'][-1] if entry['stack'] else '?'
+            if entry['templates']:
+                source += f" ({entry['templates'][-1]})"
+            group['sources'][source] += 1
+        if not groups:
+            self.stdout.write('Медленных запросов нет')
+            return
+        worst = sorted(groups.values(), key=lambda group: group[
+            options['sort']], reverse=True)[:options['limit']]
+        for group in worst:
+            self.stdout.write(
+                f"total={group['total']:.1f}ms max={group['max']:.1f}ms "
+                f"count={group['count']} "
+                f"mean={group['total'] / group['count']:.1f}ms")
+            self.stdout.write(f"    {group['normalized']}")
+            for source, count in group['sources'].most_common(3):
+                self.stdout.write(f'    {count}× {source}')
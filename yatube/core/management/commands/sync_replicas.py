@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять каждые N секунд, имитируя отставание реплик')
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError(
+                'Команда нужна только для SQLite, другие базы '
+                'реплицируются своими средствами')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: YATUBE_DB_REPLICAS')
+        while True:
+            self.sync()
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self):
+        primary = sqlite3.connect(
+            settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                started = time.perf_counter()
+                replica = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    # Онлайн-копия: читатели реплики видят либо старую
+                    # версию, либо новую целиком.
+                    primary.backup(replica)
+                finally:
+                    replica.close()
+                self.stdout.write(
+                    f'{alias}: {time.perf_counter() - started:.2f} с')
+        finally:
+            primary.close()
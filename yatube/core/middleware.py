@@ -0,0 +1,138 @@
+"""Замеры производительности каждого запроса."""
+import atexit
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import instrumentation, routers
+
+logger = logging.getLogger('yatube.performance')
+
+REPLICA_PIN_COOKIE = 'read_primary'
+
+_flush_at_exit = False
+
+
+def flush_histograms():
+    """Сохраняет гистограммы процесса в PERFORMANCE_STATS_DIR."""
+    try:
+        instrumentation.dump_histograms(settings.PERFORMANCE_STATS_DIR)
+    except OSError:
+        logger.exception('Не удалось сохранить гистограммы')
+
+
+class PerformanceMiddleware:
+    """Время SQL, шаблонов, middleware и всего запроса по вьюхам.
+
+    Ставится первым в MIDDLEWARE, чтобы общее время включало работу
+    остальных middleware. Итог уходит в заголовок Server-Timing,
+    в лог yatube.performance одной JSON-строкой и в гистограмму вьюхи.
+    С TEMPLATE_PROFILING к ним добавляется время каждого шаблона,
+    включая подключённые через include.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Ставим обёртку здесь, а не в ready(): тестовое окружение Django
+        # подменяет Template._render уже после загрузки приложений.
+        instrumentation.install()
+        self.flushed = time.monotonic()
+        # Экземпляров middleware может быть несколько (у каждого
+        # обработчика свой), а окна у процесса одни.
+        global _flush_at_exit
+        if not _flush_at_exit:
+            atexit.register(flush_histograms)
+            _flush_at_exit = True
+
+    def __call__(self, request):
+        recorder = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(recorder.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop()
+        total = (time.perf_counter() - started) * 1000
+        view_started = getattr(request, '_performance_view_started', None)
+        middleware = (view_started - started) * 1000 if view_started else 0
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        sql = recorder.sql_time * 1000
+        template = recorder.template_time * 1000
+        timings = [
+            f'sql;dur={sql:.1f};desc="{recorder.sql_count} queries"',
+            f'tpl;dur={template:.1f}',
+            f'mw;dur={middleware:.1f}',
+            f'total;dur={total:.1f}',
+        ]
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total, 3),
+            'sql_count': recorder.sql_count,
+            'sql_ms': round(sql, 3),
+            'template_ms': round(template, 3),
+            'middleware_ms': round(middleware, 3),
+        }
+        if settings.TEMPLATE_PROFILING and recorder.templates:
+            rows = instrumentation.profile_rows(recorder.templates)
+            instrumentation.template_profiles.record(recorder.templates)
+            record['templates'] = rows
+            # Имя метрики Server-Timing — токен, поэтому шаблон в desc.
+            timings.extend(
+                f'tpl-{number};dur={row["exclusive_ms"]:.1f};'
+                f'desc="{row["template"]} x{row["renders"]}"'
+                for number, row in enumerate(
+                    rows[:settings.TEMPLATE_PROFILING_TOP], start=1))
+        response['Server-Timing'] = ', '.join(timings)
+        slow = total >= settings.PERFORMANCE_SLOW_REQUEST_MS
+        logger.log(logging.WARNING if slow else logging.INFO,
+                   json.dumps(record, ensure_ascii=False))
+        instrumentation.histograms.record(view, total, recorder.sql_count)
+        if (time.monotonic() - self.flushed
+                >= settings.PERFORMANCE_FLUSH_INTERVAL):
+            self.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._performance_view_started = time.perf_counter()
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        flush_histograms()
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает GET читать с реплик, кроме недавно писавших клиентов.
+
+    Запрос, который что-то записал, ставит cookie на
+    REPLICA_PIN_SECONDS: пока она жива, клиент читает основную базу
+    и видит свои изменения, даже если реплики ещё отстают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.begin(
+            request.method in ('GET', 'HEAD')
+            and REPLICA_PIN_COOKIE not in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end()
+        if wrote:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
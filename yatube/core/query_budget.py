@@ -0,0 +1,74 @@
+"""Проверка числа SQL-запросов, которые выполняет код или страница."""
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Контекстный менеджер и декоратор: не больше budget запросов.
+
+    При превышении падает с перечнем всех выполненных запросов,
+    чтобы сразу был виден лишний (например, N+1 в шаблоне).
+    """
+
+    def __init__(self, budget, label='', using=DEFAULT_DB_ALIAS):
+        self.budget = budget
+        self.label = label
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        executed = len(self.context)
+        if executed > self.budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(
+                    self.context.captured_queries, start=1)
+            )
+            raise QueryBudgetExceeded(
+                f'{self.label or "Код"}: {executed} запросов при бюджете '
+                f'{self.budget}\n{queries}')
+        return False
+
+
+def route_names(urlconf_module):
+    """Имена всех маршрутов приложения вместе с его namespace."""
+    resolver = get_resolver(urlconf_module)
+    namespace = resolver.urlconf_module.app_name
+    return {
+        f'{namespace}:{pattern.name}'
+        for pattern in resolver.url_patterns
+        if getattr(pattern, 'name', None)
+    }
+
+
+class QueryBudgetMixin:
+    """Для TestCase: бюджеты запросов по именам маршрутов."""
+
+    def assertBudgetsCoverRoutes(self, urlconf_module, budgets):
+        self.assertEqual(
+            route_names(urlconf_module), set(budgets),
+            'У каждого маршрута должен быть бюджет запросов')
+
+    def assertPageWithinBudget(self, client, url, budget, method='get',
+                               **kwargs):
+        with query_budget(budget, f'{method.upper()} {url}'):
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                # Потоковый ответ читает базу, пока его отдают.
+                response.streaming_content = [
+                    b''.join(response.streaming_content)]
+            return response
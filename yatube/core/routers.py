@@ -0,0 +1,70 @@
+"""Чтение с реплик, запись в основную базу."""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+# Эти приложения всегда читают основную базу: сессию только что
+# записали при входе, а задачи ставятся в очередь той же транзакцией.
+PRIMARY_ONLY_APPS = {'sessions', 'tasks'}
+
+
+def begin(use_replicas):
+    """Начало запроса: можно ли ему читать с реплик."""
+    _state.use_replicas = use_replicas
+    _state.wrote = False
+
+
+def read_primary():
+    """Остаток запроса читает только основную базу."""
+    _state.use_replicas = False
+
+
+def reads_replicas():
+    """Может ли текущий запрос ещё читать с реплик."""
+    return bool(getattr(_state, 'use_replicas', False)
+                and not getattr(_state, 'wrote', False)
+                and settings.DATABASE_REPLICAS)
+
+
+def end():
+    """Конец запроса; возвращает True, если запрос что-то записал."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.use_replicas = _state.wrote = False
+    return wrote
+
+
+class PrimaryReplicaRouter:
+    """Распределяет чтения по DATABASE_REPLICAS.
+
+    С реплик читают только запросы, которым это разрешила
+    ReplicaRoutingMiddleware: безопасные GET без метки недавней записи.
+    Команды, воркеры и всё, что пишет, работают с основной базой.
+    После первой записи запрос дочитывает из основной базы.
+
+    Кэш страниц и ETag (posts.cache) тоже переводят запрос на основную
+    базу, пока поколение его ленты моложе REPLICA_PIN_SECONDS: иначе
+    страница с отстающей реплики попала бы в кэш под новым поколением.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (not getattr(_state, 'use_replicas', False)
+                or getattr(_state, 'wrote', False)
+                or model._meta.app_label in PRIMARY_ONLY_APPS
+                or not settings.DATABASE_REPLICAS):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них взаимозаменяемы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
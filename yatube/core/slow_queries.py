@@ -0,0 +1,141 @@
+"""Журнал медленных SQL-запросов с привязкой к коду и шаблонам."""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+
+from . import instrumentation
+
+logger = logging.getLogger('yatube.slow_queries')
+
+STACK_DEPTH = 8
+PARAM_LENGTH = 100
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACES = re.compile(r'\s+')
+_SKIPPED = os.path.join('core', 'slow_queries.py')
+
+
+def fingerprint(sql):
+    """Нормализованный текст запроса: без литералов и длины списков IN."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def python_stack():
+    """Последние кадры стека из кода проекта, без Django и библиотек."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and not frame.filename.endswith(_SKIPPED)
+        and 'site-packages' not in frame.filename
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:'
+        f'{frame.lineno} in {frame.name}'
+        for frame in frames[-STACK_DEPTH:]
+    ]
+
+
+def _trim(value):
+    text = repr(value)
+    if len(text) > PARAM_LENGTH:
+        text = text[:PARAM_LENGTH] + '...'
+    return text
+
+
+class SlowQueryWrapper:
+    """execute_wrapper, пишущий запросы дольше threshold_ms в журнал."""
+
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= self.threshold_ms:
+                self.record(sql, params, many, duration, context)
+
+    def record(self, sql, params, many, duration, context):
+        if many:
+            params = f'{len(params)} наборов параметров'
+        elif params is not None:
+            params = [_trim(param) for param in params]
+        normalized = fingerprint(sql)
+        logger.warning(json.dumps({
+            'time': time.time(),
+            'alias': context['connection'].alias,
+            'duration_ms': round(duration, 3),
+            'fingerprint': hashlib.md5(normalized.encode()).hexdigest(),
+            'normalized': normalized,
+            'sql': sql,
+            'params': params,
+            'stack': python_stack(),
+            'templates': instrumentation.template_stack(),
+        }, ensure_ascii=False, default=str))
+
+
+def _configure_logger():
+    if logger.handlers:
+        return
+    directory = os.path.dirname(settings.SLOW_QUERY_LOG_FILE)
+    os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(
+        settings.SLOW_QUERY_LOG_FILE,
+        maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+        encoding='utf-8',
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+
+def install_wrapper(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: вешает обёртку на новое соединение."""
+    if any(isinstance(wrapper, SlowQueryWrapper)
+           for wrapper in connection.execute_wrappers):
+        return
+    _configure_logger()
+    instrumentation.install()
+    connection.execute_wrappers.append(
+        SlowQueryWrapper(settings.SLOW_QUERY_THRESHOLD_MS))
+
+
+def uninstall_wrapper(connection):
+    connection.execute_wrappers[:] = [
+        wrapper for wrapper in connection.execute_wrappers
+        if not isinstance(wrapper, SlowQueryWrapper)
+    ]
+
+
+def log_files():
+    """Текущий файл журнала и его ротированные копии, от старых к новым."""
+    path = settings.SLOW_QUERY_LOG_FILE
+    rotated = [f'{path}.{number}'
+               for number in range(settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)]
+    return [name for name in rotated + [path] if os.path.exists(name)]
+
+
+def read_entries():
+    for path in log_files():
+        with open(path, encoding='utf-8') as source:
+            for line in source:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -0,0 +1,27 @@
+"""Настройки соединений SQLite для работы под несколькими воркерами."""
+from django.conf import settings
+
+# journal_mode меняется только вне транзакции, поэтому идёт первой.
+PRAGMA_ORDER = ('journal_mode',)
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created: выполняет SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    pragmas = sorted(
+        settings.SQLITE_PRAGMAS.items(),
+        key=lambda item: item[0] not in PRAGMA_ORDER)
+    with connection.cursor() as cursor:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def current_pragmas(connection):
+    """Фактические значения SQLITE_PRAGMAS на соединении."""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in settings.SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+    return values
@@ -0,0 +1,40 @@
+"""Прогрев кэша скомпилированных шаблонов."""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory=None):
+    """Имена всех шаблонов каталога относительно него самого."""
+    directory = directory or settings.TEMPLATES_DIR
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.endswith('.html'):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_up(directory=None):
+    """Компилирует шаблоны заранее, чтобы первый запрос их не разбирал.
+
+    Шаблон с ошибкой не останавливает процесс: он попадает в лог,
+    а ошибку увидит запрос, который его отрендерит.
+    """
+    engine = engines['django']
+    started = time.perf_counter()
+    compiled = 0
+    for name in template_names(directory):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            logger.exception('Не удалось скомпилировать шаблон %s', name)
+        else:
+            compiled += 1
+    logger.info('Скомпилировано шаблонов: %s за %.1f мс', compiled,
+                (time.perf_counter() - started) * 1000)
+    return compiled
@@ -0,0 +1,23 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TemporaryStatsRunner(DiscoverRunner):
+    """Тесты пишут замеры во временный каталог, а не в рабочий.
+
+    Каталог удаляется при выходе последним, уже после того, как
+    PerformanceMiddleware сбросит в него гистограммы процесса.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        directory = tempfile.mkdtemp(prefix='yatube-test-stats-')
+        atexit.register(shutil.rmtree, directory, True)
+        settings.PERFORMANCE_STATS_DIR = directory
+        settings.SLOW_QUERY_LOG_FILE = os.path.join(
+            directory, 'slow_queries.jsonl')
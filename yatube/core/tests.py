@@ -0,0 +1,398 @@
+import json
+import logging
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template, engines
+from django.template.base import UNKNOWN_SOURCE
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.conf import settings
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import instrumentation, slow_queries
+from core.mail import _drain, mail_queue
+from core.middleware import (REPLICA_PIN_COOKIE, PerformanceMiddleware,
+                             ReplicaRoutingMiddleware, flush_histograms)
+from core.routers import PrimaryReplicaRouter
+from core.sqlite import apply_pragmas, current_pragmas
+from core.templating import template_names, warm_up
+from posts.cache import (cache_feed_for_anonymous, invalidate_feeds,
+                         post_card_key)
+from posts.models import Group, Post, User
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.histograms.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит время SQL, шаблонов и всего запроса."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('sql;dur=', 'tpl;dur=', 'mw;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+
+    def test_structured_log_line(self):
+        """В лог уходит JSON-строка с именем вьюхи и замерами."""
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            self.client.get(reverse('about:author'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'about:author')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['sql_count'], 0)
+        self.assertGreater(record['template_ms'], 0)
+
+    def test_histograms_dump(self):
+        """Гистограммы процесса сохраняются и выводятся командой."""
+        self.client.get(reverse('about:author'))
+        self.client.get(reverse('about:tech'))
+        with tempfile.TemporaryDirectory() as directory:
+            instrumentation.dump_histograms(directory)
+            with override_settings(PERFORMANCE_STATS_DIR=directory):
+                output = StringIO()
+                call_command('performance_stats', '--buckets', stdout=output)
+        self.assertIn('about:author: n=1', output.getvalue())
+        self.assertIn('about:tech: n=1', output.getvalue())
+
+    def test_stale_process_files_removed(self):
+        """Файлы давно не обновлявшихся процессов не учитываются."""
+        self.client.get(reverse('about:author'))
+        with tempfile.TemporaryDirectory() as directory:
+            instrumentation.dump_histograms(directory)
+            stale = os.path.join(directory, '1.json')
+            with open(stale, 'w') as output:
+                json.dump({'about:tech': [[1.0, 0]]}, output)
+            os.utime(stale, (0, 0))
+            merged = instrumentation.load_histograms(directory, max_age=60)
+            self.assertFalse(os.path.exists(stale))
+        self.assertEqual(list(merged), ['about:author'])
+
+    def test_exit_flush_registered_once(self):
+        """Сброс при выходе регистрируется один раз на процесс."""
+        with mock.patch('core.middleware._flush_at_exit', False), \
+                mock.patch('atexit.register') as register:
+            for _ in range(3):
+                PerformanceMiddleware(lambda request: HttpResponse())
+        register.assert_called_once_with(flush_histograms)
+
+    def test_tests_use_temporary_stats_dir(self):
+        """Тесты не пишут замеры в рабочий каталог."""
+        self.assertTrue(os.path.basename(
+            settings.PERFORMANCE_STATS_DIR).startswith('yatube-test-stats-'))
+
+
+@override_settings(TEMPLATE_PROFILING=True)
+class TemplateProfilingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.author, group=cls.group)
+            for number in range(3))
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.template_profiles.clear()
+
+    def test_include_times_in_log_and_header(self):
+        """Каждый include учтён отдельно, своё время не больше общего."""
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        rows = {row['template']: row for row in json.loads(
+            logs.records[-1].getMessage())['templates']}
+        self.assertEqual(rows['includes/header.html']['renders'], 1)
+        self.assertEqual(rows['posts/includes/paginator.html']['renders'], 1)
+        for row in rows.values():
+            with self.subTest(template=row['template']):
+                self.assertLessEqual(
+                    row['exclusive_ms'], row['inclusive_ms'])
+        self.assertGreaterEqual(
+            rows['base.html']['inclusive_ms'],
+            rows['includes/header.html']['inclusive_ms'])
+        self.assertIn('tpl-1;dur=', response['Server-Timing'])
+
+    def test_profiles_dump(self):
+        """Профили шаблонов сохраняются и выводятся командой."""
+        for _ in range(2):
+            cache.clear()
+            self.client.get(reverse('posts:index'))
+        with tempfile.TemporaryDirectory() as directory:
+            instrumentation.dump_histograms(directory)
+            output = StringIO()
+            call_command('performance_stats', '--templates',
+                         '--dir', directory, stdout=output)
+        self.assertIn('includes/header.html: renders=2 requests=2',
+                      output.getvalue())
+
+
+class TemplateCacheTest(TestCase):
+    def test_warm_up_fills_cached_loader(self):
+        """Прогрев компилирует все шаблоны из TEMPLATES_DIR."""
+        config = dict(settings.TEMPLATES[0], APP_DIRS=False)
+        config['OPTIONS'] = dict(config['OPTIONS'], loaders=[
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ])
+        names = list(template_names())
+        with override_settings(TEMPLATES=[config]):
+            self.assertEqual(warm_up(), len(names))
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertTrue(set(names) <= set(loader.get_template_cache))
+            self.assertIn('posts/includes/paginator.html', names)
+
+
+class PostCardsTagTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            text='<b>Первая</b>\nвторая', author=cls.author, group=cls.group)
+        cls.other = Post.objects.create(text='Без группы', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, source):
+        posts = Post.objects.select_related('author', 'group').order_by('pk')
+        return Template('{% load post_cards %}' + source).render(
+            Context({'posts': posts}))
+
+    def test_card_from_flat_row(self):
+        """Текст экранирован, переносы строк стали <br>."""
+        html = self.render(
+            '{% post_cards posts as cards %}{{ cards.0 }}')
+        self.assertIn('Автор: Имя Фамилия', html)
+        self.assertIn('&lt;b&gt;Первая&lt;/b&gt;<br>вторая', html)
+        self.assertIn(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            html)
+
+    def test_group_link_only_for_posts_in_group(self):
+        """with_group добавляет ссылку на группу, если она есть."""
+        html = self.render(
+            '{% post_cards posts with_group=True as cards %}'
+            '{% for card in cards %}{{ card }}|{% endfor %}')
+        first, second, _ = html.split('|')
+        self.assertIn('Все записи группы Группа', first)
+        self.assertNotIn('Все записи группы', second)
+
+    def test_cards_read_in_one_batch(self):
+        """Отрисованные карточки кладутся в кэш и берутся оттуда."""
+        self.render('{% post_cards posts as cards %}')
+        cache.set(post_card_key(self.other.pk, self.other.version), 'Кэш')
+        html = self.render(
+            '{% post_cards posts as cards %}{{ cards.1 }}')
+        self.assertEqual(html, 'Кэш')
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        log_file = os.path.join(self.directory.name, 'slow.jsonl')
+        settings = override_settings(
+            SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=log_file)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self._reset_logger)
+        slow_queries.install_wrapper(connection=connection)
+        self.addCleanup(slow_queries.uninstall_wrapper, connection)
+
+    def _reset_logger(self):
+        for handler in slow_queries.logger.handlers[:]:
+            handler.close()
+            slow_queries.logger.removeHandler(handler)
+
+    def test_fingerprint_collapses_literals(self):
+        """Списки IN разной длины и литералы сводятся к одному отпечатку."""
+        self.assertEqual(
+            slow_queries.fingerprint('SELECT 1 WHERE id IN (%s, %s)'),
+            slow_queries.fingerprint("SELECT 2  WHERE id IN (%s, %s, %s)"),
+        )
+
+    def test_query_attributed_to_view(self):
+        """В журнал попадают SQL, параметры и строка вьюхи."""
+        self.client.get(reverse('posts:index'))
+        entries = list(slow_queries.read_entries())
+        self.assertTrue(entries)
+        self.assertIn('posts_post', entries[-1]['sql'])
+        stacks = [line for entry in entries for line in entry['stack']]
+        self.assertTrue(any(line.startswith('posts/views.py:')
+                            for line in stacks))
+
+    def test_query_attributed_to_template(self):
+        """Запрос, выполненный из шаблона, знает свой шаблон."""
+        instrumentation.install()
+        instrumentation.start()
+        self.addCleanup(instrumentation.stop)
+        Template('{{ posts|length }}').render(
+            Context({'posts': Post.objects.all()}))
+        entry = list(slow_queries.read_entries())[-1]
+        self.assertEqual(entry['templates'], [UNKNOWN_SOURCE])
+
+    def test_command_aggregates_fingerprints(self):
+        """Команда группирует одинаковые запросы."""
+        for _ in range(3):
+            list(Post.objects.filter(pk__in=[1, 2]))
+        output = StringIO()
+        call_command('slow_queries', '--sort', 'count', stdout=output)
+        self.assertIn('count=3', output.getvalue())
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    QUEUED_EMAIL_BATCH_SIZE=10,
+    QUEUED_EMAIL_BATCH_WAIT=0.05,
+)
+class QueuedEmailBackendTest(TestCase):
+    def setUp(self):
+        mail.outbox = []
+
+    def test_messages_delivered_in_batches(self):
+        """Письма доставляются фоновым потоком пачками."""
+        before = mail_queue.stats()
+        messages = [
+            mail.EmailMessage(f'Письмо {number}', 'Текст',
+                              'from@yatube.com', ['to@yatube.com'])
+            for number in range(25)
+        ]
+        self.assertEqual(mail.get_connection().send_messages(messages), 25)
+        self.assertTrue(mail_queue.flush(timeout=5))
+        after = mail_queue.stats()
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual(after['sent'] - before['sent'], 25)
+        self.assertGreaterEqual(after['batches'] - before['batches'], 3)
+        self.assertEqual(after['pending'], 0)
+
+    def test_stats_logged_on_shutdown(self):
+        """Счётчики доставки выводятся логгером core.mail при остановке."""
+        self.assertTrue(logging.getLogger('core.mail').handlers)
+        mail.get_connection().send_messages([mail.EmailMessage(
+            'Письмо', 'Текст', 'from@yatube.com', ['to@yatube.com'])])
+        with self.assertLogs('core.mail', 'INFO') as logs:
+            _drain()
+        self.assertIn("'sent'", logs.records[-1].getMessage())
+
+    def test_password_reset_mail_is_queued(self):
+        """Письмо сброса пароля уходит через очередь."""
+        User.objects.create_user('reader', 'reader@yatube.com', 'password')
+        self.client.post(reverse('users:password_reset_form'),
+                         {'email': 'reader@yatube.com'})
+        self.assertTrue(mail_queue.flush(timeout=5))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@yatube.com'])
+
+    def test_file_backend_reuses_connection(self):
+        """Пачка писем в файловый бэкенд пишется одним файлом."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                    QUEUED_EMAIL_BACKEND=(
+                        'django.core.mail.backends.filebased.EmailBackend'),
+                    QUEUED_EMAIL_BATCH_WAIT=1,
+                    EMAIL_FILE_PATH=directory):
+                mail.send_mass_mail([
+                    ('Тема', 'Текст', 'from@yatube.com', ['to@yatube.com'])
+                ] * 5)
+                self.assertTrue(mail_queue.flush(timeout=5))
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        """Куда ушло бы чтение поста внутри запроса и что ответил сервер."""
+        reads = []
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Post)
+            reads.append(self.router.db_for_read(Post))
+            reads.append(self.router.db_for_read(Session))
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return reads, response
+
+    def test_get_reads_from_replica(self):
+        """GET читает посты с реплики, а сессии — с основной базы."""
+        (post_db, session_db), response = self.route(self.factory.get('/'))
+        self.assertIn(post_db, ['replica_1', 'replica_2'])
+        self.assertEqual(session_db, 'default')
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент какое-то время читает основную базу."""
+        (post_db, _), response = self.route(
+            self.factory.post('/'), write=True)
+        self.assertEqual(post_db, 'default')
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[REPLICA_PIN_COOKIE] = '1'
+        (post_db, _), _ = self.route(request)
+        self.assertEqual(post_db, 'default')
+
+    def test_fresh_feed_generation_reads_primary(self):
+        """Сразу после записи в ленту её страница читает основную базу."""
+        reads = []
+
+        @cache_feed_for_anonymous('index')
+        def view(request):
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        def get(page):
+            request = self.factory.get('/', {'page': page})
+            request.user = AnonymousUser()
+            ReplicaRoutingMiddleware(view)(request)
+            return reads[-1]
+
+        cache.clear()
+        invalidate_feeds('index')
+        self.assertEqual(get(1), 'default')
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.assertIn(get(2), ['replica_1', 'replica_2'])
+
+    def test_outside_requests_reads_primary(self):
+        """Команды и воркеры вне запросов читают основную базу."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_1', 'posts'))
+
+
+class SQLitePragmasTest(TestCase):
+    @skipUnless(connection.vendor == 'sqlite', 'прагмы SQLite')
+    def test_pragmas_applied_on_connection(self):
+        """Прагмы профиля выполняются на новом соединении."""
+        pragmas = {'cache_size': -2000, 'busy_timeout': 1234}
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            apply_pragmas(sender=None, connection=connection)
+            self.assertEqual(current_pragmas(connection), pragmas)
+
+    def test_default_profile_keeps_sqlite_defaults(self):
+        """Без профиля production прагмы не меняются."""
+        with override_settings(SQLITE_PRAGMAS={}):
+            with CaptureQueriesContext(connection) as queries:
+                apply_pragmas(sender=None, connection=connection)
+        self.assertEqual(len(queries), 0)
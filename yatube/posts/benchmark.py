@@ -0,0 +1,340 @@
+"""Нагрузочные замеры вьюх posts на больших объёмах данных."""
+import itertools
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.template import Context, Engine
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import Mixer
+
+from core.templatetags.post_cards import render_cards
+
+from . import stats
+from .constants import POST_PER_PAGE
+from .models import Group, Post, User
+from .search import get_backend
+
+TEXT_POOL_SIZE = 1000
+MEMORY_SAMPLES = 3
+CARD_PAGE_SIZES = (10, 50, 200)
+# Замеры чистят и наполняют кэш, поэтому у них свой, а не настроенный.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'yatube-benchmark',
+    }
+}
+
+# Прежняя разметка: include карточки на каждый пост внутри цикла.
+INCLUDE_CARD = '''{% load cache %}
+{% cache 900 post_card post.pk post.version %}
+<article>
+    <ul>
+        <li>
+        Автор: {{ post.author.get_full_name }}
+        </li>
+        <li>
+        Дата публикации: {{ post.pub_date|date:"d E Y" }}
+        </li>
+    </ul>
+    <p>{{ post.text|linebreaksbr }}</p>
+    <a href="{% url 'posts:post_detail' post.pk %}">подробная информация</a>
+</article>
+{% endcache %}'''
+INCLUDE_PAGE = '''{% for post in posts %}
+    {% include 'card.html' %}
+  {% if not forloop.last %} <hr> {% endif %}
+{% endfor %}'''
+BATCHED_PAGE = '''{% load post_cards %}
+{% post_cards posts as cards %}
+{% for card in cards %}
+    {{ card }}
+  {% if not forloop.last %} <hr> {% endif %}
+{% endfor %}'''
+
+
+def private_cache():
+    """Свой кэш в памяти процесса вместо настроенного в CACHES."""
+    return override_settings(CACHES=BENCHMARK_CACHES)
+
+
+@contextmanager
+def throwaway_environment():
+    """Временная тестовая база и свой кэш: рабочие не трогаются."""
+    old_name = connection.settings_dict['NAME']
+    with private_cache():
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу, values должны быть отсортированы."""
+    if not values:
+        return 0
+    index = max(int(round(share * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def seed(posts, users, groups, batch_size=10000, stdout=None):
+    """Наполняет базу пользователями, группами и постами.
+
+    Пользователи и группы создаются через mixer, посты — пачками
+    bulk_create из заранее сгенерированного Faker набора текстов.
+    Сигналы при bulk_create не срабатывают, поэтому счётчики
+    и поисковый индекс в конце пересобираются целиком.
+    """
+    fake = Faker('ru_RU')
+    fake.seed_instance(0)
+    mixer = Mixer(commit=False)
+    User.objects.bulk_create(
+        mixer.blend(User, username=f'bench_user_{index}',
+                    first_name=fake.first_name(), last_name=fake.last_name())
+        for index in range(users)
+    )
+    Group.objects.bulk_create(
+        mixer.blend(Group, slug=f'bench-group-{index}')
+        for index in range(groups)
+    )
+    # SQLite не возвращает id из bulk_create, поэтому перечитываем их.
+    author_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    texts = [fake.paragraph(nb_sentences=5) for _ in range(TEXT_POOL_SIZE)]
+    rng = random.Random(0)
+    created = 0
+    started = time.perf_counter()
+    while created < posts:
+        size = min(batch_size, posts - created)
+        with transaction.atomic():
+            Post.objects.bulk_create(
+                Post(
+                    text=rng.choice(texts),
+                    author_id=rng.choice(author_ids),
+                    group_id=rng.choice(group_ids + [None]),
+                )
+                for _ in range(size)
+            )
+        created += size
+        if stdout:
+            rate = created / (time.perf_counter() - started)
+            stdout.write(f'Создано постов: {created} ({rate:.0f}/с)')
+    with transaction.atomic():
+        stats.rebuild()
+        get_backend().rebuild()
+
+
+def _targets():
+    """Самые нагруженные автор и группа."""
+    author = User.objects.filter(post_stats__isnull=False).order_by(
+        '-post_stats__posts_count').first()
+    group = Group.objects.filter(post_stats__isnull=False).order_by(
+        '-post_stats__posts_count').first()
+    return author, group
+
+
+def scenarios(requests):
+    """Пары (имя, функция запроса) для всех измеряемых вьюх."""
+    author, group = _targets()
+    client = Client()
+    client.force_login(author)
+    rng = random.Random(1)
+    own_posts = list(author.posts.values_list('pk', flat=True)[:requests])
+    sample = list(
+        Post.objects.order_by('?').values_list('pk', flat=True)[:requests])
+    deep_page = max(Post.objects.count() // POST_PER_PAGE // 2, 1)
+    texts = itertools.count()
+
+    def detail():
+        post_id = rng.choice(sample)
+        return client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post_id}))
+
+    def edit():
+        post_id = rng.choice(own_posts)
+        return client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post_id}),
+            {'text': f'Правка {next(texts)}', 'group': group.pk})
+
+    def create():
+        return client.post(
+            reverse('posts:post_create'),
+            {'text': f'Новый пост {next(texts)}', 'group': group.pk})
+
+    index_url = reverse('posts:index')
+    group_url = reverse('posts:group_list', kwargs={'slug': group.slug})
+    profile_url = reverse('posts:profile', kwargs={'username': author})
+    return [
+        ('index', lambda: client.get(index_url)),
+        ('index_deep_page',
+         lambda: client.get(index_url, {'page': deep_page})),
+        ('index_cursor', lambda: client.get(index_url, {'cursor': ''})),
+        ('group_list', lambda: client.get(group_url)),
+        ('profile', lambda: client.get(profile_url)),
+        ('post_detail', detail),
+        ('post_create', create),
+        ('post_edit', edit),
+    ]
+
+
+def measure(request, requests, cold=False):
+    """Время, число запросов к БД и пик памяти для серии запросов.
+
+    Память меряется отдельным коротким прогоном: tracemalloc сильно
+    замедляет код и исказил бы время.
+    """
+    timings, queries, peaks = [], [], []
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f'Ответ {response.status_code}')
+        timings.append(elapsed * 1000)
+        queries.append(len(captured.captured_queries))
+    for _ in range(min(requests, MEMORY_SAMPLES)):
+        if cold:
+            cache.clear()
+        tracemalloc.start()
+        request()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    timings.sort()
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p90_ms': round(percentile(timings, 0.90), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'max_ms': round(timings[-1], 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+        'peak_memory_kb': round(max(peaks) / 1024, 1),
+    }
+
+
+def run(requests, cold=False, only=None):
+    cache.clear()
+    return {
+        name: measure(request, requests, cold)
+        for name, request in scenarios(requests)
+        if not only or name in only
+    }
+
+
+def feed_querysets():
+    """Выборки лент: прежние select_related и строки for_cards."""
+    author, group = _targets()
+    return {
+        'index': (
+            Post.objects.select_related('author', 'group'),
+            Post.objects.for_cards(with_group=True),
+        ),
+        'group_list': (
+            group.posts.select_related('author'),
+            group.posts.for_cards(),
+        ),
+        'profile': (
+            author.posts.select_related('group'),
+            author.posts.for_cards(),
+        ),
+    }
+
+
+def _page(posts, size):
+    # Страница ленты целиком: выборка и отрисовка карточек без кэша.
+    cache.clear()
+    page = list(posts[:size])
+    render_cards(page)
+    return page
+
+
+def feed_projections(sizes=CARD_PAGE_SIZES, repeats=20):
+    """Время и пик памяти страницы ленты: полные модели и строки."""
+    results = {}
+    for feed, variants in feed_querysets().items():
+        for size in sizes:
+            result = {}
+            for name, posts in zip(('full', 'for_cards'), variants):
+                _page(posts, size)
+                timings = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    _page(posts, size)
+                    timings.append((time.perf_counter() - started) * 1000)
+                tracemalloc.start()
+                _page(posts, size)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                timings.sort()
+                result[name] = {
+                    'p50_ms': round(percentile(timings, 0.50), 3),
+                    'mean_ms': round(sum(timings) / len(timings), 3),
+                    'peak_memory_kb': round(peak / 1024, 1),
+                }
+            results[f'{feed}_{size}'] = result
+    return results
+
+
+def card_templates():
+    """Шаблоны страницы карточек: через include и через тег post_cards."""
+    engine = Engine(
+        loaders=[('django.template.loaders.locmem.Loader', {
+            'card.html': INCLUDE_CARD,
+            'include.html': INCLUDE_PAGE,
+            'batched.html': BATCHED_PAGE,
+        })],
+        libraries={
+            'cache': 'django.templatetags.cache',
+            'post_cards': 'core.templatetags.post_cards',
+        },
+    )
+    return {
+        'include': engine.get_template('include.html'),
+        'post_cards': engine.get_template('batched.html'),
+    }
+
+
+def card_rendering(sizes=CARD_PAGE_SIZES, repeats=20):
+    """Время рендеринга страницы карточек разного размера.
+
+    Холодный прогон очищает кэш карточек перед каждым рендером,
+    тёплый берёт все карточки из кэша.
+    """
+    templates = card_templates()
+    posts = list(Post.objects.select_related('author').order_by(
+        '-pub_date', '-pk')[:max(sizes)])
+    results = {}
+    for size in sizes:
+        context = {'posts': posts[:size]}
+        result = {}
+        for cold in (True, False):
+            for name, template in templates.items():
+                cache.clear()
+                template.render(Context(context))
+                timings = []
+                for _ in range(repeats):
+                    if cold:
+                        cache.clear()
+                    started = time.perf_counter()
+                    template.render(Context(context))
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                result[f"{name}_{'cold' if cold else 'warm'}"] = {
+                    'p50_ms': round(percentile(timings, 0.50), 3),
+                    'mean_ms': round(sum(timings) / len(timings), 3),
+                }
+        results[size] = result
+    return results
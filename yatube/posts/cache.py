@@ -0,0 +1,230 @@
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from core import routers
+
+from .constants import FEED_GENERATION_TIMEOUT, PAGE_CACHE_TIMEOUT
+
+POST_CARD_FRAGMENT = 'post_card'
+PAGE_CACHE_STATS = ('hits', 'misses')
+# Бэкенды, у каждого воркера свои: поколение, сдвинутое в одном,
+# другие не увидят и продолжат отвечать 304 и старыми страницами.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def feed_cache_enabled():
+    """Можно ли полагаться на поколения лент в этом кэше."""
+    return (not settings.FEED_CACHE_REQUIRE_SHARED
+            or settings.CACHES['default']['BACKEND']
+            not in PROCESS_LOCAL_CACHES)
+
+
+def post_card_key(post_id, version):
+    """Ключ карточки поста, которую рисует тег post_cards."""
+    return make_template_fragment_key(POST_CARD_FRAGMENT, [post_id, version])
+
+
+def invalidate_post_cards(posts):
+    """Сбрасывает карточки по парам (pk, version).
+
+    Правка поста меняет версию, а с ней и ключ, так что сброс нужен
+    только когда меняется то, что не входит в ключ, — например, имя автора.
+    """
+    cache.delete_many([post_card_key(*post) for post in posts])
+
+
+def _generation_key(feed):
+    # Имя ленты взято из URL: хэш делает ключ допустимым для любого кэша.
+    return f'posts:page_generation:{md5(feed.encode()).hexdigest()}'
+
+
+def _new_generation():
+    # Время изменения в наносекундах: и уникальная метка, и Last-Modified.
+    return str(time.time_ns())
+
+
+def feed_name(kind, kwargs):
+    return ':'.join([kind, *map(str, kwargs.values())])
+
+
+def feed_generation(feed):
+    """Текущее поколение ленты; смена поколения сбрасывает её страницы."""
+    key = _generation_key(feed)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), FEED_GENERATION_TIMEOUT)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_feeds(*feeds):
+    generation = _new_generation()
+    cache.set_many(
+        {_generation_key(feed): generation for feed in feeds},
+        FEED_GENERATION_TIMEOUT)
+
+
+def read_primary_if_behind(generations):
+    """Переводит запрос на основную базу, если реплики могут отставать.
+
+    Поколение — время записи, а реплики догоняют основную базу за
+    REPLICA_PIN_SECONDS. Возвращает True, если запрос переведён.
+    """
+    if not routers.reads_replicas():
+        return False
+    horizon = time.time_ns() - settings.REPLICA_PIN_SECONDS * 10 ** 9
+    if all(int(generation) <= horizon for generation in generations):
+        return False
+    routers.read_primary()
+    return True
+
+
+def post_feeds(author, group_slugs):
+    """Ленты, в которых показывается пост автора из указанных групп."""
+    return ['index', f'profile:{author.username}',
+            *(f'group:{slug}' for slug in group_slugs)]
+
+
+def _count(stat):
+    key = f'posts:page_cache:{stat}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def page_cache_stats():
+    """Попадания и промахи кэша страниц с момента последнего сброса."""
+    keys = {f'posts:page_cache:{stat}': stat for stat in PAGE_CACHE_STATS}
+    values = cache.get_many(keys)
+    return {stat: values.get(key, 0) for key, stat in keys.items()}
+
+
+def reset_page_cache_stats():
+    cache.delete_many([f'posts:page_cache:{stat}'
+                       for stat in PAGE_CACHE_STATS])
+
+
+def cache_feed_for_anonymous(kind):
+    """Кэширует страницы ленты целиком для анонимных читателей.
+
+    Ключ строится из ленты (вида и аргументов URL), её поколения и номера
+    страницы или курсора, поэтому запись в ленту сбрасывает только её.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            if (request.method != 'GET' or request.user.is_authenticated
+                    or not feed_cache_enabled()):
+                return view(request, **kwargs)
+            feed = feed_name(kind, kwargs)
+            generation = feed_generation(feed)
+            read_primary_if_behind([generation])
+            page = '\n'.join((
+                feed, generation,
+                request.GET.get('page', ''), request.GET.get('cursor', '-'),
+            ))
+            key = f'posts:page:{md5(page.encode()).hexdigest()}'
+            cached = cache.get(key)
+            if cached is not None:
+                _count('hits')
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+            _count('misses')
+            response = view(request, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, (response.content, response['Content-Type']),
+                          PAGE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+class PageState(namedtuple('PageState', 'feeds version modified')):
+    """Из каких лент собрана страница и, для поста, его версия и дата."""
+
+    def __new__(cls, feeds, version=None, modified=None):
+        return super().__new__(cls, feeds, version, modified)
+
+
+def _page_validators(state_func, request, kwargs):
+    state = state_func(request, **kwargs)
+    if state is None:
+        return None
+    return [feed_generation(feed) for feed in state.feeds], state
+
+
+def _validators(state_func, request, kwargs):
+    if not hasattr(request, '_page_validators'):
+        validators = _page_validators(state_func, request, kwargs)
+        if validators and read_primary_if_behind(validators[0]):
+            # Состояние могло прийти с отстающей реплики.
+            validators = _page_validators(state_func, request, kwargs)
+        request._page_validators = validators
+    return request._page_validators
+
+
+def conditional_on_feeds(state_func):
+    """Условный GET по поколениям лент, из которых собрана страница.
+
+    state_func(request, **kwargs) возвращает PageState или None, если
+    страницы нет. Валидаторы считаются до запросов самой view,
+    а ETag учитывает пользователя: шапка и кнопки у всех разные.
+    """
+    def etag(request, **kwargs):
+        validators = _validators(state_func, request, kwargs)
+        if validators is None:
+            return None
+        generations, state = validators
+        parts = [
+            str(request.user.pk), request.GET.get('page', ''),
+            request.GET.get('cursor', '-'), str(state.version),
+            *generations,
+        ]
+        return md5('\n'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        validators = _validators(state_func, request, kwargs)
+        if validators is None:
+            return None
+        generations, state = validators
+        times = [
+            datetime.fromtimestamp(int(generation) / 10 ** 9, tz=timezone.utc)
+            for generation in generations
+        ]
+        if state.modified is not None:
+            times.append(state.modified)
+        return max(times, default=None)
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not feed_cache_enabled():
+                return view(request, *args, **kwargs)
+            return conditional(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def feed_condition(kind):
+    return conditional_on_feeds(
+        lambda request, **kwargs: PageState([feed_name(kind, kwargs)]))
@@ -0,0 +1,15 @@
+from django.core.checks import Warning, register
+
+from .cache import feed_cache_enabled
+
+
+@register()
+def shared_feed_cache(app_configs, **kwargs):
+    if feed_cache_enabled():
+        return []
+    return [Warning(
+        'Кэш по умолчанию свой у каждого процесса: кэш страниц лент '
+        'и условный GET отключены.',
+        hint='Задайте общий кэш, например YATUBE_CACHE_DIR.',
+        id='posts.W001',
+    )]
@@ -0,0 +1,159 @@
+"""Конкурентный замер вьюх posts: читатели и писатели в разных процессах.
+
+Каждый профиль SQLite проверяется на своём временном файле базы:
+процессы-читатели открывают ленты и посты, процессы-писатели
+публикуют посты, все одновременно в течение заданного времени.
+"""
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+
+from .benchmark import percentile, private_cache, seed
+from .models import Group, Post, User
+
+READER = 'reader'
+WRITER = 'writer'
+
+
+def profiles():
+    """Профили SQLite: (прагмы, CONN_MAX_AGE)."""
+    return {
+        'default': ({}, 0),
+        'production': (settings.SQLITE_PRODUCTION_PRAGMAS, 600),
+    }
+
+
+def _urls():
+    author = User.objects.filter(posts__isnull=False).first()
+    group = Group.objects.filter(posts__isnull=False).first()
+    post_ids = list(Post.objects.values_list('pk', flat=True)[:200])
+    urls = [
+        reverse('posts:index'),
+        reverse('posts:index') + '?page=2',
+        reverse('posts:group_list', kwargs={'slug': group.slug}),
+        reverse('posts:profile', kwargs={'username': author.username}),
+    ]
+    urls += [reverse('posts:post_detail', kwargs={'post_id': pk})
+             for pk in post_ids]
+    return author.pk, group.pk, urls
+
+
+def _worker(role, number, duration, user_id, group_id, urls, results):
+    """Тело дочернего процесса: запросы до истечения duration."""
+    rng = random.Random(number)
+    # Медленные под нагрузкой запросы иначе засыпали бы вывод замера.
+    logging.getLogger('yatube.performance').setLevel(logging.ERROR)
+    timings, errors = [], 0
+    try:
+        client = Client()
+        client.force_login(User.objects.get(pk=user_id))
+        create_url = reverse('posts:post_create')
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if role == WRITER:
+                    response = client.post(create_url, {
+                        'text': f'Пост {number}-{len(timings)}',
+                        'group': group_id,
+                    })
+                else:
+                    response = client.get(rng.choice(urls))
+            except OperationalError:
+                # Например, «database is locked» без busy_timeout.
+                errors += 1
+                continue
+            if response.status_code >= 400:
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connections.close_all()
+        results.put((role, timings, errors))
+
+
+def _summary(timings, errors, duration):
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'errors': errors,
+        'rps': round(len(timings) / duration, 1),
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+    }
+
+
+def _run_workers(readers, writers, duration):
+    user_id, group_id, urls = _urls()
+    # Дочерние процессы не должны делить соединение родителя.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    roles = [READER] * readers + [WRITER] * writers
+    processes = [
+        context.Process(target=_worker, args=(
+            role, number, duration, user_id, group_id, urls, results))
+        for number, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    collected = {READER: ([], 0), WRITER: ([], 0)}
+    for _ in processes:
+        role, timings, errors = results.get()
+        all_timings, all_errors = collected[role]
+        all_timings.extend(timings)
+        collected[role] = (all_timings, all_errors + errors)
+    for process in processes:
+        process.join()
+    return {
+        role: _summary(timings, errors, duration)
+        for role, (timings, errors) in collected.items()
+        if role in roles
+    }
+
+
+def run(readers, writers, duration, posts, names=None, stdout=None):
+    """Прогоняет профили SQLite; результаты по профилям и ролям."""
+    connection = connections[DEFAULT_DB_ALIAS]
+    saved_name = connection.settings_dict['NAME']
+    saved_age = connection.settings_dict['CONN_MAX_AGE']
+    saved_pragmas = settings.SQLITE_PRAGMAS
+    directory = tempfile.mkdtemp(prefix='yatube-concurrency-')
+    results = {}
+    # Своя копия кэша у каждого процесса, как у locmem по умолчанию.
+    with private_cache():
+        try:
+            for name, (pragmas, conn_max_age) in profiles().items():
+                if names and name not in names:
+                    continue
+                connections.close_all()
+                connection.settings_dict['NAME'] = os.path.join(
+                    directory, f'{name}.sqlite3')
+                connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+                settings.SQLITE_PRAGMAS = pragmas
+                call_command('migrate', verbosity=0)
+                seed(posts, users=max(posts // 100, 2),
+                     groups=max(posts // 1000, 2))
+                cache.clear()
+                if stdout:
+                    stdout.write(f'Профиль {name}: {readers} читателей, '
+                                 f'{writers} писателей, {duration} с')
+                results[name] = _run_workers(readers, writers, duration)
+        finally:
+            connections.close_all()
+            connection.settings_dict['NAME'] = saved_name
+            connection.settings_dict['CONN_MAX_AGE'] = saved_age
+            settings.SQLITE_PRAGMAS = saved_pragmas
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
@@ -2,3 +2,15 @@ LEN_TEXT_MODEL_POST = 15
 POST_PER_PAGE = 10
 POSTS_PAG_TEST = 13
 POSTS_SECOND_PAGE = 3
+FEED_COUNT_TIMEOUT = 60 * 5
+PAGINATOR_WINDOW = 2
+PAGE_CACHE_TIMEOUT = 60
+# Истёкшее поколение ленты просто заменяется новым: страницы пересоберутся.
+FEED_GENERATION_TIMEOUT = 60 * 60 * 24
+POST_CARD_TIMEOUT = 60 * 15
+TIMELINE_LENGTH = 1000
+TIMELINE_TRIM_SLACK = 100
+TIMELINE_BATCH_SIZE = 500
+FEED_LENGTH = 50
+EXCERPT_LENGTH = 30
+TEXT_BACKFILL_BATCH_SIZE = 1000
@@ -0,0 +1,78 @@
+from django.core.cache import cache
+
+from .constants import FEED_COUNT_TIMEOUT
+from .models import AuthorStats, GroupStats
+
+FEED_ALL = 'all'
+
+
+def feed_key(group_id=None, author_id=None):
+    """Ключ ленты: общая, группы или автора."""
+    if group_id is not None:
+        return f'group:{group_id}'
+    if author_id is not None:
+        return f'author:{author_id}'
+    return FEED_ALL
+
+
+def _cache_key(key):
+    return f'posts:feed_count:{key}'
+
+
+def _load_count(key, posts):
+    kind, _, pk = key.partition(':')
+    stats_model = {'author': AuthorStats, 'group': GroupStats}.get(kind)
+    if stats_model is None:
+        return posts.count()
+    stats = stats_model.objects.filter(pk=pk).first()
+    return stats.posts_count if stats else posts.count()
+
+
+def get_feed_count(key, posts):
+    """Число постов в ленте из кэша.
+
+    При промахе ленты автора и группы берут число из таблиц статистики,
+    и только общая лента считается через COUNT(*).
+    """
+    count = cache.get(_cache_key(key))
+    if count is None:
+        count = _load_count(key, posts)
+        cache.set(_cache_key(key), count, FEED_COUNT_TIMEOUT)
+    return count
+
+
+def _shift(key, delta):
+    try:
+        cache.incr(_cache_key(key), delta)
+    except ValueError:
+        # Ключа нет в кэше: посчитаем заново при следующем чтении.
+        pass
+
+
+def post_feed_keys(post, group_id):
+    keys = [FEED_ALL, feed_key(author_id=post.author_id)]
+    if group_id is not None:
+        keys.append(feed_key(group_id=group_id))
+    return keys
+
+
+def post_created(post):
+    for key in post_feed_keys(post, post.group_id):
+        _shift(key, 1)
+
+
+def post_deleted(post):
+    for key in post_feed_keys(post, post.group_id):
+        _shift(key, -1)
+
+
+def post_group_changed(old_group_id, new_group_id):
+    if old_group_id is not None:
+        _shift(feed_key(group_id=old_group_id), -1)
+    if new_group_id is not None:
+        _shift(feed_key(group_id=new_group_id), 1)
+
+
+def forget(*keys):
+    """Сбрасывает закэшированные числа, например после массовой загрузки."""
+    cache.delete_many([_cache_key(key) for key in keys])
@@ -0,0 +1,119 @@
+"""Потоковые ленты RSS, Atom и JSON Feed.
+
+Документ отдаётся по частям из итератора по постам: в памяти нет
+ни всей выборки, ни всего XML. Из базы читаются только нужные поля.
+"""
+import itertools
+import json
+from xml.sax.saxutils import escape, quoteattr
+
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.text import Truncator
+
+from .constants import FEED_LENGTH
+
+FEED_FIELDS = (
+    'text', 'pub_date', 'modified',
+    'author__username', 'author__first_name', 'author__last_name',
+)
+CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+TITLE_WORDS = 10
+
+
+class FeedItem:
+    def __init__(self, request, post):
+        self.url = request.build_absolute_uri(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.title = Truncator(post.text).words(TITLE_WORDS)
+        self.text = post.text
+        self.published = post.pub_date
+        self.updated = post.modified
+        self.author = post.author.get_full_name() or post.author.username
+
+
+def rss(title, link, feed_url, items):
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<rss version="2.0" '
+           'xmlns:atom="http://www.w3.org/2005/Atom"><channel>'
+           f'<title>{escape(title)}</title><link>{escape(link)}</link>'
+           f'<description>{escape(title)}</description>'
+           f'<atom:link href={quoteattr(feed_url)} rel="self"/>')
+    for item in items:
+        yield (f'<item><title>{escape(item.title)}</title>'
+               f'<link>{escape(item.url)}</link>'
+               f'<guid>{escape(item.url)}</guid>'
+               f'<pubDate>{rfc2822_date(item.published)}</pubDate>'
+               f'<description>{escape(item.text)}</description></item>')
+    yield '</channel></rss>\n'
+
+
+def atom(title, link, feed_url, items):
+    # Дата обновления ленты нужна до записей: берём её у первой.
+    first = next(items, None)
+    updated = rfc3339_date(first.updated) if first else ''
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<feed xmlns="http://www.w3.org/2005/Atom">'
+           f'<title>{escape(title)}</title>'
+           f'<link href={quoteattr(link)} rel="alternate"/>'
+           f'<link href={quoteattr(feed_url)} rel="self"/>'
+           f'<id>{escape(feed_url)}</id><updated>{updated}</updated>')
+    if first is not None:
+        for item in itertools.chain([first], items):
+            yield (f'<entry><title>{escape(item.title)}</title>'
+                   f'<link href={quoteattr(item.url)} rel="alternate"/>'
+                   f'<id>{escape(item.url)}</id>'
+                   f'<published>{rfc3339_date(item.published)}</published>'
+                   f'<updated>{rfc3339_date(item.updated)}</updated>'
+                   f'<author><name>{escape(item.author)}</name></author>'
+                   f'<content type="text">{escape(item.text)}</content>'
+                   '</entry>')
+    yield '</feed>\n'
+
+
+def json_feed(title, link, feed_url, items):
+    head = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': title,
+        'home_page_url': link,
+        'feed_url': feed_url,
+    }, ensure_ascii=False)
+    # Открываем массив items внутри уже сериализованного заголовка.
+    yield head[:-1] + ', "items": ['
+    for number, item in enumerate(items):
+        yield (', ' if number else '') + json.dumps({
+            'id': item.url,
+            'url': item.url,
+            'title': item.title,
+            'content_text': item.text,
+            'date_published': rfc3339_date(item.published),
+            'date_modified': rfc3339_date(item.updated),
+            'authors': [{'name': item.author}],
+        }, ensure_ascii=False)
+    yield ']}\n'
+
+
+WRITERS = {'rss': rss, 'atom': atom, 'json': json_feed}
+
+
+def feed_response(request, fmt, title, link, posts):
+    """Потоковый ответ с лентой последних FEED_LENGTH постов.
+
+    posts — выборка из Post.objects, а не из related-менеджера: тот
+    проставляет связь каждому посту и дочитывает отложенный ключ.
+    """
+    writer = WRITERS.get(fmt)
+    if writer is None:
+        raise Http404('Неизвестный формат ленты')
+    posts = posts.select_related('author').only(*FEED_FIELDS).order_by(
+        '-pub_date', '-pk')[:FEED_LENGTH]
+    items = (FeedItem(request, post) for post in posts.iterator())
+    return StreamingHttpResponse(
+        writer(title, request.build_absolute_uri(link),
+               request.build_absolute_uri(), items),
+        content_type=CONTENT_TYPES[fmt])
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import concurrency
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает профили SQLite под одновременными читателями '
+            'и писателями вьюх posts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность прогона каждого профиля, с')
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument(
+            '--profiles', nargs='*', help='Только эти профили')
+        parser.add_argument('--output', help='Куда записать результаты')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер нужен только для SQLite')
+        results = concurrency.run(
+            options['readers'], options['writers'], options['duration'],
+            options['posts'], options['profiles'], stdout=self.stdout)
+        self.stdout.write(
+            f"{'профиль':<12}{'роль':<8}{'запр/с':>9}{'p50 мс':>9}"
+            f"{'p99 мс':>9}{'ошибок':>8}")
+        for name, roles in results.items():
+            for role, summary in roles.items():
+                self.stdout.write(
+                    f"{name:<12}{role:<8}{summary['rps']:>9}"
+                    f"{summary['p50_ms']:>9}{summary['p99_ms']:>9}"
+                    f"{summary['errors']:>8}")
+        baseline, tuned = results.get('default'), results.get('production')
+        if baseline and tuned:
+            for role in tuned:
+                if baseline[role]['rps']:
+                    gain = tuned[role]['rps'] / baseline[role]['rps']
+                    self.stdout.write(f'{role}: ×{gain:.2f} к пропускной '
+                                      'способности')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
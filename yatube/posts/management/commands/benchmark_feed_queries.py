@@ -0,0 +1,46 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает страницы лент на полных моделях из select_related '
+            'и на строках for_cards: время и пик памяти')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--sizes', type=int, nargs='+',
+            default=list(benchmark.CARD_PAGE_SIZES),
+            help='Размеры страницы')
+        parser.add_argument(
+            '--repeats', type=int, default=20,
+            help='Число страниц на каждый замер')
+        parser.add_argument(
+            '--output', help='Куда записать результаты в JSON')
+
+    def handle(self, *args, **options):
+        with benchmark.throwaway_environment():
+            benchmark.seed(options['posts'], users=20, groups=5)
+            results = benchmark.feed_projections(
+                options['sizes'], options['repeats'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            self.stdout.write('')
+        self.stdout.write(
+            f"{'страница':<16}{'p50 было':>10}{'p50 стало':>11}{'Δ%':>8}"
+            f"{'КиБ было':>10}{'КиБ стало':>11}{'Δ%':>8}")
+        for page, result in results.items():
+            row = f'{page:<16}'
+            for metric in ('p50_ms', 'peak_memory_kb'):
+                before = result['full'][metric]
+                after = result['for_cards'][metric]
+                delta = (after - before) / before * 100 if before else 0
+                row += f'{before:>10.2f}{after:>11.2f}{delta:>+8.1f}'
+            self.stdout.write(row)
@@ -0,0 +1,46 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает рендеринг карточек постов через include в цикле '
+            'и через тег post_cards на страницах разного размера')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+',
+            default=list(benchmark.CARD_PAGE_SIZES),
+            help='Размеры страницы')
+        parser.add_argument(
+            '--repeats', type=int, default=20,
+            help='Число рендеров на каждый замер')
+        parser.add_argument(
+            '--output', help='Куда записать результаты в JSON')
+
+    def handle(self, *args, **options):
+        with benchmark.throwaway_environment():
+            benchmark.seed(max(options['sizes']), users=10, groups=3)
+            results = benchmark.card_rendering(
+                options['sizes'], options['repeats'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            self.stdout.write('')
+        self.stdout.write(f"{'':>7}{'без кэша карточек':^29}"
+                          f"{'карточки в кэше':^29}")
+        columns = f"{'include':>10}{'post_cards':>12}{'×':>7}"
+        self.stdout.write(f"{'постов':>7}{columns}{columns}")
+        for size, result in results.items():
+            row = f'{size:>7}'
+            for state in ('cold', 'warm'):
+                before = result[f'include_{state}']['p50_ms']
+                after = result[f'post_cards_{state}']['p50_ms']
+                speedup = before / after if after else 0
+                row += f'{before:>10.2f}{after:>12.2f}{speedup:>7.1f}'
+            self.stdout.write(row)
@@ -0,0 +1,86 @@
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import benchmark
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Наполняет временную базу постами и замеряет вьюхи posts: '
+            'перцентили времени, число запросов и память')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Число запросов на каждый сценарий')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом')
+        parser.add_argument(
+            '--only', nargs='*', help='Замерить только эти сценарии')
+        parser.add_argument(
+            '--output', help='Куда записать результаты в JSON')
+        parser.add_argument(
+            '--compare', help='JSON с прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        with benchmark.throwaway_environment():
+            benchmark.seed(
+                options['posts'], options['users'], options['groups'],
+                options['batch_size'], stdout=self.stdout)
+            results = benchmark.run(
+                options['requests'], options['cold'], options['only'])
+        report = {
+            'commit': _git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'data': {
+                key: options[key] for key in ('posts', 'users', 'groups')},
+            'cold_cache': options['cold'],
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+        else:
+            json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+            self.stdout.write('')
+        if options['compare']:
+            with open(options['compare']) as previous:
+                self.compare(json.load(previous)['scenarios'], results)
+
+    def compare(self, before, after):
+        self.stdout.write(
+            f"{'сценарий':<18}{'p50 было':>10}{'p50 стало':>11}"
+            f"{'Δ%':>8}{'запросов':>10}")
+        for name, current in after.items():
+            old = before.get(name)
+            if old is None:
+                continue
+            delta = ((current['p50_ms'] - old['p50_ms'])
+                     / old['p50_ms'] * 100 if old['p50_ms'] else 0)
+            self.stdout.write(
+                f"{name:<18}{old['p50_ms']:>10.2f}{current['p50_ms']:>11.2f}"
+                f"{delta:>+8.1f}"
+                f"{old['queries_max']:>5}→{current['queries_max']:<4}")
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.transfer import FORMATS, export_rows, guess_format, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты в JSON Lines или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл выгрузки, «-» — стандартный вывод')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--author', help='Только посты этого автора')
+        parser.add_argument('--group', help='Только посты этой группы')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        posts = Post.objects.all()
+        if options['author']:
+            posts = posts.filter(author__username=options['author'])
+        if options['group']:
+            posts = posts.filter(group__slug=options['group'])
+        started = time.perf_counter()
+        if path == '-':
+            written = write_rows(export_rows(posts), self.stdout, file_format)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                written = write_rows(export_rows(posts), stream, file_format)
+        elapsed = time.perf_counter() - started
+        # Отчёт в stderr, чтобы не смешивать его с выгрузкой в stdout.
+        self.stderr.write(
+            f'Выгружено постов: {written} за {elapsed:.1f} с '
+            f'({written / elapsed if elapsed else 0:.0f}/с)')
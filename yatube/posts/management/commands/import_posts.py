@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (FORMATS, Importer, TransferError, guess_format,
+                            read_rows)
+
+
+class Command(BaseCommand):
+    help = ('Загружает посты из JSON Lines или CSV с полями '
+            'author, group, text, pub_date')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с постами, «-» — стандартный ввод')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать неизвестных авторов и группы')
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, поиск и ленты подписок')
+
+    def report(self, imported, rate):
+        self.stdout.write(f'Загружено постов: {imported} ({rate:.0f}/с)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        importer = Importer(
+            batch_size=options['batch_size'],
+            create_missing=options['create_missing'],
+            report=self.report,
+        )
+        stream = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8', newline=''))
+        try:
+            importer.run(read_rows(stream, file_format))
+        except TransferError as error:
+            raise CommandError(
+                f'{error}. Загружено до ошибки: {importer.imported}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            # Пачки до ошибки уже в базе: счётчики и ленты нужны и им.
+            if importer.imported and not options['skip_derived']:
+                importer.refresh_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {importer.imported} постов, {importer.rate:.0f}/с'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import page_cache_stats, reset_page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша страниц лент'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', help='Обнулить счётчики')
+
+    def handle(self, *args, **options):
+        stats = page_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f'hit_ratio={ratio:.2%}')
+        if options['reset']:
+            reset_page_cache_stats()
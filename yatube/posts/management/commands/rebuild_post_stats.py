@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и групп'
+
+    def handle(self, *args, **options):
+        authors, groups = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано: авторов {authors}, групп {groups}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}'))
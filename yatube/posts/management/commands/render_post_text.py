@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import text
+from posts.constants import TEXT_BACKFILL_BATCH_SIZE
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заново считает HTML и выдержки текстов постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=TEXT_BACKFILL_BATCH_SIZE)
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Только посты, у которых HTML ещё не посчитан')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['missing']:
+            posts = posts.filter(text_html='')
+        done = text.backfill(posts, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}'))
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:55
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+# Значения на момент миграции: она не должна зависеть от кода приложения.
+EXCERPT_LENGTH = 30
+BATCH_SIZE = 1000
+
+
+def render_text(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias)
+    table = Post._meta.db_table
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk).order_by('pk').values_list(
+            'pk', 'text')[:BATCH_SIZE])
+        if not batch:
+            return
+        # Прямой UPDATE не сдвигает версии и даты изменения постов.
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {table} SET text_html = %s, excerpt = %s '
+                'WHERE id = %s',
+                [(str(linebreaksbr(text, autoescape=True)),
+                  Truncator(text).chars(EXCERPT_LENGTH), pk)
+                 for pk, text in batch])
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=30, verbose_name='Выдержка'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.RunPython(render_text, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,59 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils import timezone
 
-from posts.constants import LEN_TEXT_MODEL_POST
+from posts.constants import EXCERPT_LENGTH, LEN_TEXT_MODEL_POST
+
+from . import text as post_text
+from .rows import GROUP_FIELDS, POST_FIELDS, PostRowIterable
 
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    def for_cards(self, with_group=False):
+        """Строки PostRow для карточек лент вместо экземпляров Post.
+
+        with_group добавляет название и адрес группы поста.
+        """
+        fields = POST_FIELDS + (GROUP_FIELDS if with_group else ())
+        posts = self.values_list(*fields)
+        posts._iterable_class = PostRowIterable
+        return posts
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Обработанный текст считается и для постов без save()."""
+        objs = list(objs)
+        for post in objs:
+            post.text_html, post.excerpt = post_text.render(post.text)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        """Массовое изменение тоже сдвигает дату изменения и версию.
+
+        Новый текст строкой обрабатывается сразу; выражение вместо
+        строки оставляет text_html прежним до render_post_text.
+        """
+        if isinstance(kwargs.get('text'), str):
+            kwargs['text_html'], kwargs['excerpt'] = post_text.render(
+                kwargs['text'])
+        kwargs.setdefault('modified', timezone.now())
+        kwargs.setdefault('version', F('version') + 1)
+        return super().update(**kwargs)
+
+
 class Post(models.Model):
     text = models.TextField('Текст поста', help_text='Введите текст поста')
+    # Считаются из text при записи (posts.text), шаблоны выводят готовое.
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    excerpt = models.CharField(
+        'Выдержка', max_length=EXCERPT_LENGTH, blank=True, editable=False)
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    modified = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
+    version = models.PositiveIntegerField(
+        'Версия', default=1, editable=False)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -25,12 +70,47 @@ class Post(models.Model):
         verbose_name='Группа'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        # Индексы повторяют сортировку лент: и OFFSET-, и keyset-страницы
+        # читаются по индексу без отдельной сортировки.
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.text[:LEN_TEXT_MODEL_POST]
 
+    def save(self, *args, **kwargs):
+        self.text_html, self.excerpt = post_text.render(self.text)
+        bump = not self._state.adding
+        if bump:
+            # Сдвиг в самом UPDATE: две одновременные правки не получат
+            # одну версию, а с ней и один ключ карточки в кэше.
+            self.version = F('version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                update_fields = {*update_fields, 'modified', 'version'}
+                if 'text' in update_fields:
+                    update_fields |= {'text_html', 'excerpt'}
+                kwargs['update_fields'] = update_fields
+        # Сигналы обновляют счётчики в той же транзакции, что и пост.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if bump:
+                self.refresh_from_db(fields=['version'])
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
 
 class Group(models.Model):
     title = models.CharField('Название группы', max_length=200)
@@ -43,3 +123,118 @@ class Group(models.Model):
 
     def __str__(self) -> str:
         return self.title
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.posts_count}'
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Группа'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+
+    def __str__(self) -> str:
+        return f'{self.group}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    """Подписка читателя на автора или на группу."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='following',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='followers',
+        verbose_name='Группа'
+    )
+
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='follow_unique_author'),
+            models.UniqueConstraint(fields=['user', 'group'],
+                                    name='follow_unique_group'),
+            models.CheckConstraint(
+                check=(models.Q(author__isnull=True, group__isnull=False)
+                       | models.Q(author__isnull=False, group__isnull=True)),
+                name='follow_author_or_group'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user} → {self.author or self.group}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок читателя, разложенный при публикации."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    # Копия даты поста: лента читается одним проходом по индексу
+    # этой таблицы, без сортировки по posts_post.
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='timeline_unique_post'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.post_id}'
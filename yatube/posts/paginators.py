@@ -0,0 +1,132 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .constants import PAGINATOR_WINDOW
+from .counts import get_feed_count
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction, post):
+    """Кодирует позицию поста в ленте в непрозрачный токен."""
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, pub_date, pk) или None для битого токена."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class FeedPage(Page):
+    """Страница с укороченным списком номеров вокруг текущей."""
+
+    is_cursor = False
+
+    @cached_property
+    def page_window(self):
+        """Номера страниц для навигации, None на месте пропуска."""
+        last = self.paginator.num_pages
+        start = max(self.number - PAGINATOR_WINDOW, 1)
+        end = min(self.number + PAGINATOR_WINDOW, last)
+        window = list(range(start, end + 1))
+        if start > 1:
+            window[:0] = [1, None] if start > 2 else [1]
+        if end < last:
+            window += [None, last] if end < last - 1 else [last]
+        return window
+
+
+class FeedPaginator(Paginator):
+    """Пагинатор, берущий общее число постов из счётчиков ленты."""
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return get_feed_count(self.count_key, self.object_list)
+
+    def _get_page(self, *args, **kwargs):
+        return FeedPage(*args, **kwargs)
+
+
+class CursorPage(Page):
+    """Страница ленты, которая знает только соседей, но не общее число."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, 1, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    Стоимость любой страницы одинакова: запрос идёт по индексу
+    от позиции, закодированной в курсоре.
+    """
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor) if cursor else None
+        posts = self.object_list
+        if position is None:
+            direction = CURSOR_NEXT
+            posts = posts.order_by('-pub_date', '-pk')
+        else:
+            direction, pub_date, pk = position
+            if direction == CURSOR_NEXT:
+                posts = posts.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+                ).order_by('-pub_date', '-pk')
+            else:
+                posts = posts.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+                ).order_by('pub_date', 'pk')
+        rows = list(posts[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == CURSOR_PREVIOUS:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, self, None, None)
+        if direction == CURSOR_NEXT:
+            has_next, has_previous = has_more, position is not None
+        else:
+            has_next, has_previous = True, has_more
+        return CursorPage(
+            rows,
+            self,
+            encode_cursor(CURSOR_NEXT, rows[-1]) if has_next else None,
+            encode_cursor(CURSOR_PREVIOUS, rows[0]) if has_previous else None,
+        )
@@ -0,0 +1,72 @@
+"""Лёгкие строки постов для лент вместо полных моделей.
+
+Лента читает через values_list только то, что показывают карточки,
+и собирает из кортежей объекты со __slots__: без экземпляров Post,
+User и Group, их сигналов и лишних столбцов вроде хэша пароля.
+Авторов лента не соединяет: имена берутся пачкой из users.profiles.
+"""
+from django.db.models.query import ValuesListIterable
+
+POST_FIELDS = ('pk', 'text_html', 'pub_date', 'version', 'author_id')
+GROUP_FIELDS = ('group_id', 'group__title', 'group__slug')
+
+
+class GroupRow:
+    __slots__ = ('pk', 'title', 'slug')
+
+    def __init__(self, pk, title, slug):
+        self.pk = pk
+        self.title = title
+        self.slug = slug
+
+    def __str__(self):
+        return self.title
+
+
+class PostRow:
+    """Пост ленты; равен экземпляру Post с тем же pk."""
+
+    __slots__ = (
+        'pk', 'text_html', 'pub_date', 'version', 'author_id', 'group')
+
+    def __init__(self, pk, text_html, pub_date, version, author_id,
+                 group=None):
+        self.pk = pk
+        self.text_html = text_html
+        self.pub_date = pub_date
+        self.version = version
+        self.author_id = author_id
+        self.group = group
+
+    @property
+    def id(self):
+        return self.pk
+
+    @property
+    def group_id(self):
+        return self.group.pk if self.group is not None else None
+
+    def __eq__(self, other):
+        from .models import Post
+        if not isinstance(other, (PostRow, Post)):
+            return NotImplemented
+        return self.pk is not None and self.pk == other.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __repr__(self):
+        return f'<PostRow: {self.pk}>'
+
+
+class PostRowIterable(ValuesListIterable):
+    """Итератор values_list, отдающий PostRow вместо кортежей."""
+
+    def __iter__(self):
+        with_group = len(self.queryset._fields) > len(POST_FIELDS)
+        for (pk, text_html, pub_date, version, author_id,
+             *group) in super().__iter__():
+            yield PostRow(
+                pk, text_html, pub_date, version, author_id,
+                GroupRow(*group) if with_group and group[0] else None,
+            )
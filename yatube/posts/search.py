@@ -0,0 +1,96 @@
+from django.db import connection
+
+SEARCH_TABLE = 'posts_post_fts'
+
+
+def _match_query(text):
+    """Превращает ввод пользователя в запрос FTS5: все слова, в кавычках."""
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in text.split())
+
+
+class SearchBackend:
+    """Полнотекстовый индекс постов.
+
+    Бэкенд хранит индекс рядом с таблицей постов и умеет отфильтровать
+    queryset постов по запросу, отсортировав по релевантности.
+    Для Postgres сюда ляжет реализация на tsvector и GIN-индексе.
+    """
+
+    def index(self, post):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def filter(self, posts, query):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Индекс на виртуальной таблице FTS5, rowid совпадает с id поста."""
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, text) '
+                'VALUES (%s, %s)', [post.pk, post.text])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text) '
+                'SELECT id, text FROM posts_post')
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) "
+                "VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+            return cursor.fetchone()[0]
+
+    def filter(self, posts, query):
+        match = _match_query(query)
+        if not match:
+            return posts.none()
+        return posts.extra(
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.rowid = posts_post.id',
+                   f'{SEARCH_TABLE} MATCH %s'],
+            params=[match],
+            order_by=[f'{SEARCH_TABLE}.rank', '-pub_date'],
+        )
+
+
+class LikeSearchBackend(SearchBackend):
+    """Запасной вариант без индекса для остальных СУБД."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def filter(self, posts, query):
+        words = query.split()
+        if not words:
+            return posts.none()
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        return posts
+
+
+def get_backend():
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return LikeSearchBackend()
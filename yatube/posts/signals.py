@@ -0,0 +1,118 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from users import profiles
+
+from . import counts, stats, tasks
+from .cache import invalidate_feeds, invalidate_post_cards, post_feeds
+from .models import Group, Post, User
+
+
+def _invalidate_post_feeds(post, *group_ids):
+    group_ids = {pk for pk in group_ids if pk is not None}
+    slugs = []
+    if post.group_id in group_ids and Post.group.is_cached(post):
+        # Форма уже подставила объект группы, лишний запрос не нужен.
+        group_ids.discard(post.group_id)
+        slugs.append(post.group.slug)
+    if group_ids:
+        slugs += Group.objects.filter(
+            pk__in=group_ids).values_list('slug', flat=True)
+    invalidate_feeds(*post_feeds(post.author, slugs))
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """Запоминает исходную группу, чтобы заметить её смену при save()."""
+    # Через __dict__, чтобы не подгружать отложенное поле лишним запросом.
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    _invalidate_post_feeds(
+        instance, instance._loaded_group_id, instance.group_id)
+    tasks.index_post.delay(instance.pk)
+    if created:
+        counts.post_created(instance)
+        stats.author_changed(instance.author_id, 1)
+        stats.group_changed(instance.group_id, 1)
+        tasks.fan_out_post.delay(instance.pk)
+    elif instance._loaded_group_id != instance.group_id:
+        counts.post_group_changed(
+            instance._loaded_group_id, instance.group_id)
+        stats.group_changed(instance._loaded_group_id, -1)
+        stats.group_changed(instance.group_id, 1)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    tasks.remove_post_from_index.delay(instance.pk)
+    _invalidate_post_feeds(instance, instance.group_id)
+    counts.post_deleted(instance)
+    stats.author_changed(instance.author_id, -1)
+    stats.group_changed(instance.group_id, -1)
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, update_fields, **kwargs):
+    """Профиль, карточки и ленты показывают имя автора.
+
+    Всё это сбрасывается, только если username или отображаемое имя
+    действительно изменились.
+    """
+    if created:
+        # Нового пользователя ещё нигде не показывали.
+        profiles.remember(instance)
+        return
+    if update_fields and not set(profiles.NAME_FIELDS) & set(update_fields):
+        # Например, вход пользователя сохраняет только last_login.
+        return
+    if not profiles.refresh(instance):
+        return
+    posts = instance.posts.order_by()
+    invalidate_post_cards(posts.values_list('pk', 'version'))
+    slugs = posts.filter(group__isnull=False).values_list(
+        'group__slug', flat=True).distinct()
+    invalidate_feeds(*post_feeds(instance, slugs))
+
+
+@receiver(post_init, sender=Group)
+def remember_slug(sender, instance, **kwargs):
+    """Запоминает исходный slug, чтобы сбросить и ленту по старому адресу."""
+    instance._loaded_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    feeds = {f'group:{instance.slug}'}
+    if not created:
+        # Карточки главной показывают название и адрес группы.
+        feeds.add('index')
+        if instance._loaded_slug:
+            feeds.add(f'group:{instance._loaded_slug}')
+    invalidate_feeds(*feeds)
+    instance._loaded_slug = instance.slug
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    """Посты группы теряют её через SET_NULL, минуя PostQuerySet.update.
+
+    Поэтому версию и дату изменения сдвигаем здесь, пока посты ещё
+    находятся по группе, и запоминаем их авторов для post_delete.
+    """
+    posts = instance.posts.order_by()
+    instance._post_authors = list(posts.values_list(
+        'author__username', flat=True).distinct())
+    posts.update()
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_feeds(
+        'index', f'group:{instance.slug}',
+        *(f'profile:{username}'
+          for username in getattr(instance, '_post_authors', ())))
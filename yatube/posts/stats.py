@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, GroupStats, Post
+
+
+def _shift(model, field, pk, delta):
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        rows = rows.filter(posts_count__gte=-delta)
+    if not rows.update(posts_count=F('posts_count') + delta) and delta > 0:
+        # Строки ещё нет — считаем честно. При уменьшении не создаём,
+        # иначе каскадное удаление автора воскресит его статистику.
+        count = Post.objects.filter(**{field: pk}).count()
+        model.objects.update_or_create(
+            pk=pk, defaults={'posts_count': count})
+
+
+def author_changed(author_id, delta):
+    _shift(AuthorStats, 'author_id', author_id, delta)
+
+
+def group_changed(group_id, delta):
+    if group_id is not None:
+        _shift(GroupStats, 'group_id', group_id, delta)
+
+
+@transaction.atomic
+def rebuild():
+    """Пересчитывает статистику авторов и групп с нуля."""
+    AuthorStats.objects.all().delete()
+    GroupStats.objects.all().delete()
+    authors = Post.objects.values('author').annotate(total=Count('pk'))
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=row['author'], posts_count=row['total'])
+        for row in authors.order_by()
+    )
+    groups = (Post.objects.filter(group__isnull=False)
+              .values('group').annotate(total=Count('pk')))
+    GroupStats.objects.bulk_create(
+        GroupStats(group_id=row['group'], posts_count=row['total'])
+        for row in groups.order_by()
+    )
+    return AuthorStats.objects.count(), GroupStats.objects.count()
@@ -0,0 +1,28 @@
+"""Фоновые задачи постов: поиск и ленты подписок."""
+from tasks.queue import task
+
+from . import timeline
+from .models import Post
+from .search import get_backend
+
+
+@task
+def index_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        get_backend().index(post)
+
+
+@task
+def remove_post_from_index(post_id):
+    get_backend().remove(post_id)
+
+
+@task
+def fan_out_post(post_id):
+    timeline.fan_out(post_id)
+
+
+@task
+def rebuild_timeline(user_id):
+    timeline.rebuild(user_id)
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.template import Context
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import AuthorStats, Post
+
+
+class BenchmarkTest(TestCase):
+    def test_seed_and_run(self):
+        """Наполнение и прогон всех сценариев на маленьких данных."""
+        benchmark.seed(posts=25, users=3, groups=2, batch_size=10)
+        self.assertEqual(Post.objects.count(), 25)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            25)
+        results = benchmark.run(requests=2)
+        self.assertEqual(set(results), {
+            'index', 'index_deep_page', 'index_cursor', 'group_list',
+            'profile', 'post_detail', 'post_create', 'post_edit',
+        })
+        for name, result in results.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['requests'], 2)
+                self.assertGreater(result['queries_max'], 0)
+                self.assertLessEqual(result['p50_ms'], result['max_ms'])
+
+    def test_card_rendering(self):
+        """Замер карточек сравнивает include и post_cards по размерам."""
+        benchmark.seed(posts=5, users=2, groups=1)
+        results = benchmark.card_rendering(sizes=(2, 5), repeats=2)
+        self.assertEqual(set(results), {2, 5})
+        self.assertEqual(set(results[5]), {
+            'include_cold', 'post_cards_cold',
+            'include_warm', 'post_cards_warm',
+        })
+
+    def test_feed_projections(self):
+        """Замер лент сравнивает полные модели и строки for_cards."""
+        benchmark.seed(posts=5, users=2, groups=2)
+        results = benchmark.feed_projections(sizes=(3,), repeats=2)
+        self.assertEqual(
+            set(results), {'index_3', 'group_list_3', 'profile_3'})
+        for page, result in results.items():
+            with self.subTest(page=page):
+                self.assertEqual(set(result), {'full', 'for_cards'})
+                self.assertGreater(result['for_cards']['peak_memory_kb'], 0)
+
+    def test_card_templates_render_same_posts(self):
+        """Оба варианта страницы выводят одни и те же посты."""
+        benchmark.seed(posts=3, users=2, groups=1)
+        posts = list(Post.objects.select_related('author'))
+        for name, template in benchmark.card_templates().items():
+            with self.subTest(template=name):
+                html = template.render(Context({'posts': posts}))
+                for post in posts:
+                    self.assertIn(f'/posts/{post.pk}/', html)
+
+    def test_private_cache(self):
+        """Замеры чистят свой кэш, а не настроенный."""
+        cache.set('posts:benchmark-test', 1)
+        with benchmark.private_cache():
+            self.assertIsNone(cache.get('posts:benchmark-test'))
+            cache.clear()
+        self.assertEqual(cache.get('posts:benchmark-test'), 1)
+
+    def test_percentile(self):
+        """Перцентиль по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([], 0.5), 0)
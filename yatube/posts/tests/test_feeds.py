@@ -0,0 +1,115 @@
+import json
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='TestAuthor', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост <{number}> & текст',
+                group=cls.group)
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def feed_urls(self, fmt):
+        return [
+            reverse('posts:index_feed', kwargs={'fmt': fmt}),
+            reverse('posts:group_feed',
+                    kwargs={'slug': self.group.slug, 'fmt': fmt}),
+            reverse('posts:profile_feed',
+                    kwargs={'username': self.author, 'fmt': fmt}),
+        ]
+
+    def test_rss(self):
+        """RSS содержит посты от новых к старым."""
+        for url in self.feed_urls('rss'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(
+                    response['Content-Type'],
+                    'application/rss+xml; charset=utf-8')
+                root = ElementTree.fromstring(self.body(response))
+                texts = [item.findtext('description')
+                         for item in root.iter('item')]
+                self.assertEqual(
+                    texts, [post.text for post in reversed(self.posts)])
+
+    def test_atom(self):
+        """Atom содержит записи с автором."""
+        for url in self.feed_urls('atom'):
+            with self.subTest(url=url):
+                root = ElementTree.fromstring(
+                    self.body(self.client.get(url)))
+                entries = root.findall(f'{ATOM}entry')
+                self.assertEqual(len(entries), 3)
+                self.assertEqual(
+                    entries[0].findtext(f'{ATOM}author/{ATOM}name'),
+                    'Лев Толстой')
+
+    def test_json_feed(self):
+        """JSON Feed разбирается и ссылается на страницы постов."""
+        for url in self.feed_urls('json'):
+            with self.subTest(url=url):
+                feed = json.loads(self.body(self.client.get(url)))
+                self.assertEqual(len(feed['items']), 3)
+                self.assertTrue(feed['items'][0]['url'].endswith(reverse(
+                    'posts:post_detail',
+                    kwargs={'post_id': self.posts[-1].pk})))
+
+    def test_conditional_get(self):
+        """Повторный опрос неизменившейся ленты — 304 без запросов к БД."""
+        url = self.feed_urls('rss')[1]
+        response = self.client.get(url)
+        self.body(response)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        Post.objects.create(author=self.author, text='Новый', group=self.group)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_reads_only_needed_columns(self):
+        """Лента не читает лишние поля пользователя."""
+        for url in self.feed_urls('rss'):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.body(self.client.get(url))
+                [sql] = [query['sql'] for query in queries.captured_queries
+                         if 'FROM "posts_post"' in query['sql']]
+                self.assertNotIn('password', sql)
+                self.assertNotIn('"posts_post"."group_id",', sql)
+
+    def test_unknown_feed(self):
+        """Неизвестный формат или группа — 404."""
+        urls = (
+            reverse('posts:index_feed', kwargs={'fmt': 'xml'}),
+            reverse('posts:group_feed',
+                    kwargs={'slug': 'missing', 'fmt': 'rss'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
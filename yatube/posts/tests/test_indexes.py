@@ -0,0 +1,78 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Post, Group, User
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text='Тестовый пост', group=cls.group)
+            for _ in range(15)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_queries(self, url):
+        """SQL-запросы страницы, читающие ленту постов."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент идут по индексу и без временной сортировки."""
+        feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for feed in feeds:
+            first = self.client.get(feed + '?cursor=').context['page_obj']
+            second = self.client.get(
+                feed + f'?cursor={first.next_cursor}').context['page_obj']
+            urls = (
+                feed,
+                feed + '?page=2',
+                feed + f'?cursor={first.next_cursor}',
+                feed + f'?cursor={second.previous_cursor}',
+            )
+            for url in urls:
+                sqls = self.feed_queries(url)
+                self.assertTrue(sqls, url)
+                for sql in sqls:
+                    with self.subTest(url=url, sql=sql):
+                        with connection.cursor() as cursor:
+                            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                            plan = ' '.join(
+                                str(row[-1]) for row in cursor.fetchall())
+                        self.assertIn('USING INDEX post_', plan)
+                        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_timeline_query_uses_index(self):
+        """Лента подписок читается по индексу TimelineEntry без сортировки."""
+        timeline.rebuild(self.user.pk)
+        posts = timeline.timeline_posts(self.user).select_related(
+            'author', 'group')[:10]
+        sql, params = posts.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('timeline_user_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Post, Group, User
+from posts.models import AuthorStats, GroupStats, Post, Group, User
 from posts.constants import LEN_TEXT_MODEL_POST
 
 
@@ -30,3 +33,158 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class PostRowsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Имя', last_name='Фамилия')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Длинное описание')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост')
+        cls.other = Post.objects.create(author=cls.user, text='Без группы')
+
+    def test_rows_carry_card_fields(self):
+        """Строка ленты содержит автора, группу и равна своему посту."""
+        row, other = Post.objects.for_cards(with_group=True).filter(
+            pk__in=[self.post.pk, self.other.pk]).order_by('pk')
+        self.assertEqual(row, self.post)
+        self.assertEqual(row.version, self.post.version)
+        self.assertEqual(row.author_id, self.user.pk)
+        self.assertEqual(
+            (row.group_id, row.group.slug), (self.group.pk, 'group'))
+        self.assertIsNone(other.group)
+
+    def test_rows_skip_unused_columns(self):
+        """Лента не соединяет авторов и не читает описания групп."""
+        sql = str(Post.objects.for_cards(with_group=True).query)
+        self.assertNotIn('auth_user', sql)
+        self.assertNotIn('description', sql)
+
+
+class PostVersionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def test_new_post_version(self):
+        """Новый пост получает версию 1 и дату изменения."""
+        self.assertEqual(self.post.version, 1)
+        self.assertIsNotNone(self.post.modified)
+
+    def test_save_bumps_version(self):
+        """save(), в том числе с update_fields, сдвигает версию и дату."""
+        modified = self.post.modified
+        self.post.text = 'Правка'
+        self.post.save()
+        self.post.group = self.group
+        self.post.save(update_fields=['group'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 3)
+        self.assertGreater(self.post.modified, modified)
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        """Две правки одной загруженной версии получают разные версии."""
+        author_copy = Post.objects.get(pk=self.post.pk)
+        admin_copy = Post.objects.get(pk=self.post.pk)
+        author_copy.text = 'Правка автора'
+        author_copy.save()
+        admin_copy.text = 'Правка админа'
+        admin_copy.save()
+        self.assertEqual((author_copy.version, admin_copy.version), (2, 3))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 3)
+
+    def test_queryset_update_bumps_version(self):
+        """Массовое update(), как в действиях админки, сдвигает версию."""
+        modified = self.post.modified
+        Post.objects.filter(pk=self.post.pk).update(group=self.group)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        self.assertGreater(self.post.modified, modified)
+
+
+class PostTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_text_processed_on_save(self):
+        """save() экранирует текст, ставит <br> и обрезает выдержку."""
+        post = Post.objects.create(
+            author=self.user, text='<b>Очень</b> длинный первый абзац\nвторой')
+        self.assertEqual(
+            post.text_html,
+            '&lt;b&gt;Очень&lt;/b&gt; длинный первый абзац<br>второй')
+        self.assertEqual(post.excerpt, '<b>Очень</b> длинный первый а…')
+        post.text = 'Правка'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual((post.text_html, post.excerpt), ('Правка', 'Правка'))
+
+    def test_text_processed_without_save(self):
+        """bulk_create и update() строкой тоже обрабатывают текст."""
+        post, = Post.objects.bulk_create(
+            [Post(author=self.user, text='Первая\nвторая')])
+        post = Post.objects.get(author=self.user)
+        self.assertEqual(post.text_html, 'Первая<br>вторая')
+        Post.objects.filter(pk=post.pk).update(text='Массовая\nправка')
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'Массовая<br>правка')
+
+    def test_render_post_text_command(self):
+        """Команда заново считает HTML и выдержки."""
+        Post.objects.create(author=self.user, text='Первая\nвторая')
+        Post.objects.update(text_html='', excerpt='')
+        output = StringIO()
+        call_command('render_post_text', '--missing', stdout=output)
+        self.assertIn('Обработано постов: 1', output.getvalue())
+        post = Post.objects.get()
+        self.assertEqual(
+            (post.text_html, post.excerpt), ('Первая<br>вторая', post.text))
+
+
+class PostStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+
+    def assertCounts(self, author, group, other_group):
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count, author)
+        for group_obj, expected in ((self.group, group),
+                                    (self.other_group, other_group)):
+            stats = GroupStats.objects.filter(group=group_obj).first()
+            self.assertEqual(stats.posts_count if stats else 0, expected)
+
+    def test_counters_follow_post_changes(self):
+        """Счётчики меняются при создании, смене группы и удалении."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        Post.objects.create(author=self.user, text='Без группы')
+        self.assertCounts(2, 1, 0)
+        post.group = self.other_group
+        post.save()
+        self.assertCounts(2, 0, 1)
+        post.delete()
+        self.assertCounts(1, 0, 0)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_post_stats восстанавливает счётчики."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text='Пост', group=self.group)
+            for _ in range(3)
+        )
+        call_command('rebuild_post_stats', stdout=StringIO())
+        self.assertCounts(3, 3, 0)
@@ -0,0 +1,118 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_budget import (QueryBudgetExceeded, QueryBudgetMixin,
+                               query_budget)
+from posts.models import Post, Group, User
+
+# Бюджеты для авторизованного автора: сессия и пользователь — 2 запроса.
+# Лентам с холодным кэшем нужен ещё запрос имён авторов (users.profiles).
+GET_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_list': 7,
+    'posts:profile': 5,
+    'posts:post_detail': 4,
+    'posts:search': 4,
+    'posts:post_create': 3,
+    'posts:post_edit': 5,
+    'posts:index_feed': 3,
+    'posts:group_feed': 4,
+    'posts:profile_feed': 4,
+    'posts:follow_index': 4,
+    'posts:profile_follow': 8,
+    'posts:profile_unfollow': 5,
+    'posts:group_follow': 8,
+    'posts:group_unfollow': 5,
+}
+# Правка перечитывает версию, сдвинутую в самом UPDATE.
+POST_BUDGETS = {
+    'posts:post_create': 11,
+    'posts:post_edit': 10,
+}
+
+
+class PostsQueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='TestAuthor')
+        cls.reader = User.objects.create(username='TestReader')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text='Тестовый пост', group=cls.group)
+            for _ in range(15)
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group)
+        cls.urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': cls.author}),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}),
+            'posts:search': reverse('posts:search') + '?q=пост',
+            'posts:post_create': reverse('posts:post_create'),
+            'posts:post_edit': reverse(
+                'posts:post_edit', kwargs={'post_id': cls.post.pk}),
+            'posts:index_feed': reverse(
+                'posts:index_feed', kwargs={'fmt': 'rss'}),
+            'posts:group_feed': reverse(
+                'posts:group_feed',
+                kwargs={'slug': cls.group.slug, 'fmt': 'atom'}),
+            'posts:profile_feed': reverse(
+                'posts:profile_feed',
+                kwargs={'username': cls.author, 'fmt': 'json'}),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:profile_follow': reverse(
+                'posts:profile_follow', kwargs={'username': cls.reader}),
+            'posts:profile_unfollow': reverse(
+                'posts:profile_unfollow', kwargs={'username': cls.reader}),
+            'posts:group_follow': reverse(
+                'posts:group_follow', kwargs={'slug': cls.group.slug}),
+            'posts:group_unfollow': reverse(
+                'posts:group_unfollow', kwargs={'slug': cls.group.slug}),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_author = Client()
+        self.authorized_author.force_login(self.author)
+
+    def test_every_route_has_budget(self):
+        """У каждого маршрута posts есть бюджет запросов."""
+        self.assertBudgetsCoverRoutes('posts.urls', GET_BUDGETS)
+
+    def test_get_budgets(self):
+        """Страницы posts укладываются в бюджет запросов."""
+        for name, budget in GET_BUDGETS.items():
+            with self.subTest(name=name):
+                cache.clear()
+                self.assertPageWithinBudget(
+                    self.authorized_author, self.urls[name], budget)
+
+    def test_deep_and_cursor_pages_budgets(self):
+        """Вторая страница и keyset-страница не дороже первой."""
+        for query in ('?page=2', '?cursor='):
+            with self.subTest(query=query):
+                self.assertPageWithinBudget(
+                    self.authorized_author,
+                    self.urls['posts:index'] + query,
+                    GET_BUDGETS['posts:index'])
+
+    def test_post_budgets(self):
+        """Создание и правка поста укладываются в бюджет запросов."""
+        data = {'text': 'Новый текст', 'group': self.group.pk}
+        for name, budget in POST_BUDGETS.items():
+            with self.subTest(name=name):
+                self.assertPageWithinBudget(
+                    self.authorized_author, self.urls[name], budget,
+                    method='post', data=data)
+
+    def test_budget_failure_lists_queries(self):
+        """Превышение бюджета показывает выполненные запросы."""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'posts_group'):
+            with query_budget(0, 'группы'):
+                list(Group.objects.all())
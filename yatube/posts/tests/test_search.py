@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.constants import POST_PER_PAGE
+from posts.models import Post, User
+from posts.search import SEARCH_TABLE, get_backend
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='TestAuthor')
+
+    def setUp(self):
+        self.cats = Post.objects.create(
+            author=self.author, text='Коты любят спать на солнце')
+        self.dogs = Post.objects.create(
+            author=self.author, text='Собаки любят гулять')
+        self.many = Post.objects.create(
+            author=self.author, text='Коты, коты и ещё раз КОТЫ')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_search_finds_ranked_posts(self):
+        """Поиск находит посты по словам и сортирует по релевантности."""
+        self.assertEqual(self.search('коты'), [self.many, self.cats])
+        self.assertEqual(self.search('любят'), [self.dogs, self.cats])
+        self.assertEqual(self.search('коты спать'), [self.cats])
+        self.assertEqual(self.search('"; DROP'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.dogs.text = 'Собаки и коты'
+        self.dogs.save()
+        self.assertIn(self.dogs, self.search('коты'))
+        self.cats.delete()
+        self.assertNotIn(self.cats, self.search('коты'))
+
+    def test_search_pagination_keeps_query(self):
+        """Вторая страница поиска помнит запрос."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text='Пагинация коты')
+            for _ in range(POST_PER_PAGE)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(reverse('posts:search'), {'q': 'коты'})
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82%D1%8B&amp;page=2')
+        self.assertEqual(len(self.search('коты', page=2)), 2)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        self.assertEqual(self.search('коты'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('коты'), [self.many, self.cats])
+
+    def test_admin_uses_search_backend(self):
+        """Поиск в админке идёт через индекс."""
+        request = RequestFactory().get('/')
+        posts, use_distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'собаки')
+        self.assertEqual(list(posts), [self.dogs])
+        self.assertIn(SEARCH_TABLE, str(posts.query))
+        self.assertFalse(use_distinct)
+
+    def test_backend_for_vendor(self):
+        """На SQLite используется индекс FTS5."""
+        if connection.vendor == 'sqlite':
+            self.assertEqual(
+                type(get_backend()).__name__, 'SQLiteSearchBackend')
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Group, Post, TimelineEntry, User
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='Reader')
+        cls.author = User.objects.create(username='Author')
+        cls.stranger = User.objects.create(username='Stranger')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def timeline_of(self, user):
+        return list(timeline.timeline_posts(user))
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора и группы."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, group=self.group)
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group)
+        self.assertEqual(self.timeline_of(self.reader), [post])
+        self.assertEqual(self.timeline_of(self.stranger), [post])
+        self.assertEqual(self.timeline_of(self.author), [post])
+
+    def test_post_not_fanned_out_to_others(self):
+        """Пост не попадает в ленту того, кто не подписан."""
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(self.timeline_of(self.reader), [])
+
+    def test_follow_and_unfollow_rebuild_timeline(self):
+        """Подписка подтягивает старые посты, отписка их убирает."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertEqual(self.timeline_of(self.reader), [post])
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.timeline_of(self.reader), [])
+
+    def test_group_follow(self):
+        """Подписка на группу добавляет её посты в ленту."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group)
+        self.client.get(reverse(
+            'posts:group_follow', kwargs={'slug': self.group.slug}))
+        self.assertEqual(self.timeline_of(self.reader), [post])
+        self.client.get(reverse(
+            'posts:group_unfollow', kwargs={'slug': self.group.slug}))
+        self.assertEqual(self.timeline_of(self.reader), [])
+
+    def test_cannot_follow_self(self):
+        """На себя подписаться нельзя."""
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.reader}))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_timeline_is_capped(self):
+        """Выросшая лента обрезается до заданной длины."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'TIMELINE_LENGTH', 3), \
+                mock.patch.object(timeline, 'TIMELINE_TRIM_SLACK', 1):
+            posts = [Post.objects.create(author=self.author, text='Пост')
+                     for _ in range(5)]
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(self.timeline_of(self.reader), posts[:1:-1])
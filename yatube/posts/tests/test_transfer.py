@@ -0,0 +1,101 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Group, Post, User
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='TestAuthor')
+        self.group = Group.objects.create(title='Группа', slug='test-slug')
+        self.pub_date = datetime(2020, 5, 1, 12, 30, tzinfo=timezone.utc)
+        for number in range(3):
+            post = Post.objects.create(
+                author=self.author, text=f'Пост {number}',
+                group=self.group if number else None)
+            Post.objects.filter(pk=post.pk).update(pub_date=self.pub_date)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def rows(self):
+        return list(Post.objects.order_by('text').values_list(
+            'author__username', 'group__slug', 'text', 'pub_date'))
+
+    def test_round_trip(self):
+        """Выгрузка и повторная загрузка дают те же посты."""
+        for name in ('posts.jsonl', 'posts.csv'):
+            with self.subTest(name=name):
+                before = self.rows()
+                call_command('export_posts', self.path(name),
+                             stderr=StringIO())
+                Post.objects.all().delete()
+                call_command('import_posts', self.path(name),
+                             '--batch-size', '2', stdout=StringIO())
+                self.assertEqual(self.rows(), before)
+
+    def test_import_refreshes_stats(self):
+        """После загрузки пересчитаны счётчики автора и группы."""
+        call_command('export_posts', self.path('posts.jsonl'),
+                     stderr=StringIO())
+        call_command('import_posts', self.path('posts.jsonl'),
+                     stdout=StringIO())
+        self.author.post_stats.refresh_from_db()
+        self.group.post_stats.refresh_from_db()
+        self.assertEqual(self.author.post_stats.posts_count, 6)
+        self.assertEqual(self.group.post_stats.posts_count, 4)
+
+    def test_failed_import_refreshes_stats(self):
+        """Посты, загруженные до ошибки, попадают в счётчики."""
+        with open(self.path('posts.jsonl'), 'w') as stream:
+            stream.write('{"author": "TestAuthor", "group": "test-slug", '
+                         '"text": "Пост", "pub_date": "2020-05-01T12:00"}\n'
+                         '{"author": "Stranger", "group": null, '
+                         '"text": "Пост", "pub_date": "2020-05-01T12:00"}\n')
+        with self.assertRaisesMessage(CommandError, 'Загружено до ошибки: 1'):
+            call_command('import_posts', self.path('posts.jsonl'),
+                         '--batch-size', '1', stdout=StringIO())
+        self.author.post_stats.refresh_from_db()
+        self.group.post_stats.refresh_from_db()
+        self.assertEqual(self.author.post_stats.posts_count, 4)
+        self.assertEqual(self.group.post_stats.posts_count, 3)
+
+    def test_invalid_rows(self):
+        """Несуществующая дата и недостающие столбцы — ошибка строки."""
+        files = {
+            'posts.jsonl': ('{"author": "TestAuthor", "text": "Пост", '
+                            '"pub_date": "2020-13-45T00:00:00"}\n',
+                            'Строка 1: неверная дата'),
+            'posts.csv': ('author,group,text,pub_date\nTestAuthor\n',
+                          "Строка 2: пустое поле 'text'"),
+        }
+        for name, (content, message) in files.items():
+            with self.subTest(name=name):
+                with open(self.path(name), 'w') as stream:
+                    stream.write(content)
+                with self.assertRaisesMessage(CommandError, message):
+                    call_command('import_posts', self.path(name),
+                                 stdout=StringIO())
+
+    def test_unknown_author(self):
+        """Неизвестный автор — ошибка, если не разрешено его создавать."""
+        with open(self.path('posts.jsonl'), 'w') as stream:
+            stream.write('{"author": "Stranger", "group": "new-group", '
+                         '"text": "Пост", "pub_date": "2020-05-01T12:00"}\n')
+        with self.assertRaisesMessage(CommandError, 'Stranger'):
+            call_command('import_posts', self.path('posts.jsonl'),
+                         stdout=StringIO())
+        call_command('import_posts', self.path('posts.jsonl'),
+                     '--create-missing', stdout=StringIO())
+        post = Post.objects.get(author__username='Stranger')
+        self.assertEqual(post.group.slug, 'new-group')
@@ -1,9 +1,21 @@
-from django.test import Client, TestCase
+import warnings
+
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django import forms
 
 from posts.models import Post, Group, User
+from posts.cache import (feed_generation, invalidate_feeds,
+                         page_cache_stats, post_card_key,
+                         reset_page_cache_stats)
+from posts.checks import shared_feed_cache
 from posts.constants import POST_PER_PAGE, POSTS_PAG_TEST, POSTS_SECOND_PAGE
+from posts.counts import feed_key, get_feed_count
+from posts.paginators import FeedPaginator
 
 
 class PostPagesTests(TestCase):
@@ -28,6 +40,9 @@ class PostPagesTests(TestCase):
             'group': forms.fields.ChoiceField,
         }
 
+    def setUp(self):
+        cache.clear()
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
@@ -83,6 +98,22 @@ class PostPagesTests(TestCase):
         post = Post.objects.get(pk=self.post.id)
         self.assertEqual(context_object, post)
 
+    def test_detail_and_profile_skip_aggregates(self):
+        """Страницы поста и профиля не считают посты через COUNT."""
+        pages = {
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}):
+                'Всего постов автора:  <span > 1 </span>',
+            reverse('posts:profile', kwargs={'username': self.author}):
+                'Всего постов: 1',
+        }
+        for url, expected in pages.items():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertContains(response, expected)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
     def test_create_post_show_correct_context(self):
         """Шаблон create_post сформирован с правильным контекстом."""
         response = self.authorized_author.get(reverse('posts:post_create'))
@@ -160,6 +191,9 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:profile', kwargs={'username': cls.user.username}),
         ]
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_contains_ten_records(self):
         """Пагинатор выводит 10 постов на первую страницу."""
         for page in self.pages:
@@ -175,3 +209,310 @@ class PaginatorViewsTest(TestCase):
                 response = self.client.get(page + '?page=2')
                 self.assertEqual(len(response.context['page_obj']),
                                  POSTS_SECOND_PAGE)
+
+    def test_cursor_pages_walk_feed(self):
+        """Keyset-пагинация проходит ленту вперёд и назад без потерь."""
+        for page in self.pages:
+            with self.subTest(page=page):
+                first = self.client.get(page + '?cursor=').context['page_obj']
+                self.assertEqual(len(first), POST_PER_PAGE)
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    page + f'?cursor={first.next_cursor}').context['page_obj']
+                self.assertEqual(len(second), POSTS_SECOND_PAGE)
+                self.assertFalse(second.has_next())
+                back = self.client.get(
+                    page + f'?cursor={second.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                # Ленты отдают строки PostRow, поэтому сверяем по pk.
+                self.assertEqual(
+                    {post.pk for post in [*first, *second]},
+                    set(Post.objects.values_list('pk', flat=True)))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдаёт первую страницу."""
+        response = self.client.get(self.pages[0] + '?cursor=broken!')
+        self.assertEqual(len(response.context['page_obj']), POST_PER_PAGE)
+
+    def test_feed_count_cached_and_updated(self):
+        """Счётчик ленты берётся из кэша и обновляется при записи."""
+        key = feed_key(group_id=self.group.pk)
+        posts = self.group.posts.all()
+        self.assertEqual(get_feed_count(key, posts), POSTS_PAG_TEST)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_feed_count(key, posts), POSTS_PAG_TEST)
+        post = Post.objects.create(
+            author=self.user, text='Ещё пост', group=self.group)
+        self.assertEqual(get_feed_count(key, posts), POSTS_PAG_TEST + 1)
+        post.group = None
+        post.save()
+        self.assertEqual(get_feed_count(key, posts), POSTS_PAG_TEST)
+
+    def test_page_window(self):
+        """Навигация показывает окно страниц, а не весь диапазон."""
+        paginator = FeedPaginator(list(range(200)), POST_PER_PAGE)
+        cases = {
+            1: [1, 2, 3, None, 20],
+            4: [1, 2, 3, 4, 5, 6, None, 20],
+            10: [1, None, 8, 9, 10, 11, 12, None, 20],
+            20: [1, None, 18, 19, 20],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    paginator.page(number).page_window, expected)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='TestAuthor', first_name='Имя', last_name='Фамилия')
+        cls.post = Post.objects.create(author=cls.author, text='Старый текст')
+
+    def setUp(self):
+        cache.clear()
+        # Авторизованный клиент, чтобы не попасть в кэш целых страниц.
+        self.reader = Client()
+        self.reader.force_login(self.author)
+        self.reader.get(reverse('posts:index'))
+
+    def test_card_served_from_cache(self):
+        """Карточка поста берётся из кэша по ключу (pk, version)."""
+        key = post_card_key(self.post.pk, self.post.version)
+        self.assertIn('Старый текст', cache.get(key))
+        cache.set(key, 'Карточка из кэша')
+        response = self.reader.get(reverse('posts:index'))
+        self.assertContains(response, 'Карточка из кэша')
+
+    def test_pages_show_stored_html(self):
+        """Страницы выводят HTML, посчитанный при записи, а не текст."""
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='<em>Готовый HTML</em>', excerpt='Выдержка')
+        cache.clear()
+        for url in (reverse('posts:index'), reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk})):
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.reader.get(url), '<em>Готовый HTML</em>')
+        self.assertContains(
+            self.reader.get(reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk})),
+            '<title>Пост Выдержка</title>')
+
+    def test_card_follows_bulk_update(self):
+        """Массовое update() меняет версию, а с ней и ключ карточки."""
+        Post.objects.filter(pk=self.post.pk).update(text='Массовая правка')
+        response = self.reader.get(reverse('posts:index'))
+        self.assertContains(response, 'Массовая правка')
+
+    def test_card_invalidated_on_edit(self):
+        """Редактирование поста сбрасывает его карточку."""
+        self.reader.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст'},
+        )
+        response = self.reader.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст')
+
+    def test_card_invalidated_on_author_rename(self):
+        """Смена имени автора сбрасывает его карточки."""
+        self.author.first_name = 'Другое'
+        self.author.save()
+        response = self.reader.get(reverse('posts:index'))
+        self.assertContains(response, 'Другое Фамилия')
+
+
+class FeedPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='TestAuthor')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group)
+        cls.feeds = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            'other': reverse('posts:group_list', kwargs={'slug': 'other'}),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': 'TestAuthor'}),
+        }
+
+    def setUp(self):
+        cache.clear()
+        reset_page_cache_stats()
+        self.authorized_author = Client()
+        self.authorized_author.force_login(self.author)
+        for url in self.feeds.values():
+            self.client.get(url)
+
+    def test_anonymous_pages_cached(self):
+        """Повторный анонимный запрос отдаётся из кэша."""
+        for name, url in self.feeds.items():
+            with self.subTest(feed=name):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/?page=1')['X-Cache'], 'MISS')
+        self.assertEqual(page_cache_stats(), {'hits': 4, 'misses': 5})
+
+    def test_authorized_pages_not_cached(self):
+        """Авторизованные пользователи кэш страниц не используют."""
+        response = self.authorized_author.get(self.feeds['index'])
+        self.assertFalse(response.has_header('X-Cache'))
+
+    def test_post_create_invalidates_only_its_feeds(self):
+        """Новый пост сбрасывает только ленты, в которые он попал."""
+        self.authorized_author.post(
+            reverse('posts:post_create'),
+            data={'text': 'Новый пост', 'group': self.group.pk},
+        )
+        expected = {
+            'index': 'MISS', 'group': 'MISS', 'other': 'HIT',
+            'profile': 'MISS',
+        }
+        for name, status in expected.items():
+            with self.subTest(feed=name):
+                response = self.client.get(self.feeds[name])
+                self.assertEqual(response['X-Cache'], status)
+
+    def test_post_edit_invalidates_old_and_new_group(self):
+        """Перенос поста в другую группу сбрасывает обе ленты групп."""
+        self.authorized_author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Тестовый пост', 'group': self.other_group.pk},
+        )
+        for name in ('group', 'other'):
+            with self.subTest(feed=name):
+                response = self.client.get(self.feeds[name])
+                self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_author_rename_invalidates_group_feeds(self):
+        """Новое имя автора сбрасывает и ленты групп его постов."""
+        self.author.first_name = 'Новое'
+        self.author.save()
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(feed=name):
+                response = self.client.get(self.feeds[name])
+                self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.feeds['other'])['X-Cache'],
+                         'HIT')
+
+    def test_group_rename_invalidates_index_and_old_slug(self):
+        """Смена названия и адреса группы сбрасывает главную и старую ленту."""
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        self.assertEqual(self.client.get(self.feeds['index'])['X-Cache'],
+                         'MISS')
+        self.assertEqual(
+            feed_generation('group:test-slug'),
+            feed_generation('group:renamed'))
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='TestAuthor')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_author = Client()
+        self.authorized_author.force_login(self.author)
+
+    def test_not_modified_until_post_edited(self):
+        """Страницы отвечают 304, пока пост не отредактирован."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        self.authorized_author.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'group': self.group.pk},
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_detail_follows_bulk_update(self):
+        """Страница поста не отвечает 304 после массового update()."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        Post.objects.filter(pk=self.post.pk).update(text='Массовая правка')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_group_deletion_changes_pages(self):
+        """Удаление группы меняет страницы её постов и их лент."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        version = self.post.version
+        Group.objects.get(pk=self.group.pk).delete()
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).version, version + 1)
+        del etags[reverse('posts:group_list',
+                          kwargs={'slug': self.group.slug})]
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        """Last-Modified принимается в If-Modified-Since."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                last_modified = self.client.get(url)['Last-Modified']
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        """Анонимный и авторизованный пользователь видят разные ETag."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(
+                    self.client.get(url)['ETag'],
+                    self.authorized_author.get(url)['ETag'],
+                )
+
+
+class ProcessLocalCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='TestAuthor')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(FEED_CACHE_REQUIRE_SHARED=True)
+    def test_local_cache_disables_page_cache_and_etag(self):
+        """Кэш в памяти процесса отключает кэш страниц и условный GET."""
+        for _ in range(2):
+            response = self.client.get(reverse('posts:index'))
+            self.assertFalse(response.has_header('X-Cache'))
+            self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(
+            [error.id for error in shared_feed_cache(None)], ['posts.W001'])
+
+    def test_generation_key_safe_for_any_feed_name(self):
+        """Ключ поколения допустим и для имени ленты с пробелами."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            invalidate_feeds('profile:имя с пробелом')
+            self.assertIsNotNone(feed_generation('profile:имя с пробелом'))
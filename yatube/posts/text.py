@@ -0,0 +1,40 @@
+"""Обработка текста поста при записи, а не при каждом показе."""
+from django.db import connections, transaction
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+from .cache import invalidate_post_cards
+from .constants import EXCERPT_LENGTH, TEXT_BACKFILL_BATCH_SIZE
+
+
+def render(text):
+    """(HTML с экранированием и <br>, короткая выдержка для заголовка)."""
+    return (
+        str(linebreaksbr(text, autoescape=True)),
+        Truncator(text).chars(EXCERPT_LENGTH),
+    )
+
+
+def backfill(posts, batch_size=TEXT_BACKFILL_BATCH_SIZE):
+    """Пересчитывает text_html и excerpt у постов выборки.
+
+    Пишет прямым UPDATE, чтобы не сдвигать версии и даты изменения,
+    и работает с исторической моделью из миграций. Возвращает число постов.
+    """
+    table = posts.model._meta.db_table
+    connection = connections[posts.db]
+    last_pk = done = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk).order_by('pk').values_list(
+            'pk', 'version', 'text')[:batch_size])
+        if not batch:
+            return done
+        with transaction.atomic(using=posts.db), connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {table} SET text_html = %s, excerpt = %s '
+                'WHERE id = %s',
+                [(*render(text), pk) for pk, _, text in batch])
+        # Карточки в кэше собраны из прежнего HTML.
+        invalidate_post_cards((pk, version) for pk, version, _ in batch)
+        last_pk = batch[-1][0]
+        done += len(batch)
@@ -0,0 +1,94 @@
+"""Лента подписок: пост раскладывается по лентам читателей при публикации.
+
+Чтение ленты — один проход по индексу TimelineEntry, его стоимость
+не зависит от числа подписок. Раскладку выполняют фоновые задачи
+из posts.tasks.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .constants import (TIMELINE_BATCH_SIZE, TIMELINE_LENGTH,
+                        TIMELINE_TRIM_SLACK)
+from .models import Follow, Post, TimelineEntry
+
+
+def followers(author_id, group_id):
+    """Читатели, в чью ленту попадает пост автора в группе."""
+    condition = Q(author_id=author_id)
+    if group_id is not None:
+        condition |= Q(group_id=group_id)
+    readers = set(Follow.objects.filter(condition).values_list(
+        'user_id', flat=True))
+    readers.add(author_id)
+    return sorted(readers)
+
+
+def trim(user_ids):
+    """Обрезает ленты до TIMELINE_LENGTH, когда они заметно длиннее.
+
+    Запас TIMELINE_TRIM_SLACK позволяет не чистить ленту после
+    каждого поста: выросшие ленты находятся одним запросом на пачку.
+    """
+    overgrown = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .values('user_id').annotate(entries=Count('pk'))
+        .filter(entries__gt=TIMELINE_LENGTH + TIMELINE_TRIM_SLACK)
+        .values_list('user_id', flat=True)
+    )
+    for user_id in overgrown:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        pub_date, post_id = entries.order_by(
+            '-pub_date', '-post_id').values_list(
+            'pub_date', 'post_id')[TIMELINE_LENGTH]
+        entries.filter(
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, post_id__lte=post_id)
+        ).delete()
+
+
+def fan_out(post_id):
+    """Добавляет новый пост в ленты всех его читателей."""
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id', 'pub_date').first()
+    if post is None:
+        return
+    author_id, group_id, pub_date = post
+    readers = followers(author_id, group_id)
+    for start in range(0, len(readers), TIMELINE_BATCH_SIZE):
+        batch = readers[start:start + TIMELINE_BATCH_SIZE]
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post_id=post_id,
+                           pub_date=pub_date) for user_id in batch),
+            ignore_conflicts=True,
+        )
+        trim(batch)
+
+
+def rebuild(user_id):
+    """Собирает ленту читателя заново по его текущим подпискам."""
+    authors, groups = {user_id}, set()
+    for author_id, group_id in Follow.objects.filter(
+            user_id=user_id).values_list('author_id', 'group_id'):
+        if author_id is not None:
+            authors.add(author_id)
+        else:
+            groups.add(group_id)
+    posts = Post.objects.filter(
+        Q(author_id__in=authors) | Q(group_id__in=groups)
+    ).order_by('-pub_date', '-pk').values_list(
+        'pk', 'pub_date')[:TIMELINE_LENGTH]
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        )
+
+
+def timeline_posts(user):
+    """Посты ленты подписок в порядке её индекса."""
+    # F() вместо строки: иначе сортировка по связи добавит JOIN
+    # и порядок Post.Meta.ordering.
+    return Post.objects.filter(timeline_entries__user=user).order_by(
+        F('timeline_entries__pub_date').desc(),
+        F('timeline_entries__post').desc())
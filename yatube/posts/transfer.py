@@ -0,0 +1,198 @@
+"""Потоковые выгрузка и загрузка постов в JSON Lines и CSV.
+
+Строки читаются и пишутся по одной, в памяти держится только текущая
+пачка, поэтому объём файла не ограничен памятью процесса.
+"""
+import csv
+import json
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counts, stats, tasks
+from .cache import invalidate_feeds
+from .models import Follow, Group, Post, User
+from .search import get_backend
+
+FIELDS = ('author', 'group', 'text', 'pub_date')
+FORMATS = ('jsonl', 'csv')
+EXPORT_CHUNK_SIZE = 2000
+
+
+class TransferError(Exception):
+    pass
+
+
+def guess_format(path):
+    return 'csv' if path.endswith('.csv') else 'jsonl'
+
+
+def export_rows(posts):
+    """Словари постов для выгрузки, без загрузки всей выборки в память."""
+    rows = posts.order_by('pk').values_list(
+        'author__username', 'group__slug', 'text', 'pub_date')
+    for author, group, text, pub_date in rows.iterator(
+            chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'author': author,
+            'group': group or '',
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+        }
+
+
+def write_rows(rows, stream, file_format):
+    written = 0
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+            written += 1
+    return written
+
+
+def read_rows(stream, file_format):
+    """Пары (номер строки, словарь) из файла выгрузки."""
+    if file_format == 'csv':
+        # Номер строки файла с учётом заголовка.
+        yield from enumerate(csv.DictReader(stream), start=2)
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            raise TransferError(f'Строка {number}: {error}')
+
+
+@contextmanager
+def explicit_dates():
+    """Отключает auto_now, чтобы сохранить даты из файла."""
+    fields = [Post._meta.get_field('pub_date'),
+              Post._meta.get_field('modified')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Importer:
+    """Загружает посты пачками bulk_create, каждая в своей транзакции.
+
+    Авторы и группы ищутся по словарям username -> id и slug -> id,
+    собранным одним запросом, а не запросом на каждую строку.
+    """
+
+    def __init__(self, batch_size=5000, create_missing=False, report=None):
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.report = report
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.touched_authors = set()
+        self.touched_groups = set()
+        self.imported = 0
+
+    def resolve(self, lookup, model, field, value, number):
+        pk = lookup.get(value)
+        if pk is None:
+            if not self.create_missing:
+                raise TransferError(
+                    f'Строка {number}: не найден {field} {value!r}')
+            defaults = {'title': value} if model is Group else {}
+            pk = model.objects.get_or_create(
+                **{field: value}, defaults=defaults)[0].pk
+            lookup[value] = pk
+        return pk
+
+    def build(self, number, row):
+        try:
+            author, text = row['author'], row['text']
+        except KeyError as error:
+            raise TransferError(f'Строка {number}: нет поля {error}')
+        # В CSV без части столбцов и в JSON с null поля приходят как None.
+        for field, value in (('author', author), ('text', text)):
+            if value is None:
+                raise TransferError(f'Строка {number}: пустое поле {field!r}')
+        group = row.get('group') or None
+        try:
+            # Строка вида даты с несуществующим числом даёт ValueError.
+            pub_date = parse_datetime(row.get('pub_date') or '')
+        except (TypeError, ValueError):
+            pub_date = None
+        if pub_date is None:
+            raise TransferError(f'Строка {number}: неверная дата')
+        if timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        author_id = self.resolve(
+            self.authors, User, 'username', author, number)
+        group_id = group and self.resolve(
+            self.groups, Group, 'slug', group, number)
+        self.touched_authors.add(author_id)
+        if group_id:
+            self.touched_groups.add(group_id)
+        return Post(text=text, author_id=author_id, group_id=group_id,
+                    pub_date=pub_date, modified=pub_date)
+
+    def flush(self, batch):
+        with transaction.atomic():
+            # Размер INSERT подберёт сам Django под лимиты базы.
+            Post.objects.bulk_create(batch)
+        self.imported += len(batch)
+        if self.report:
+            self.report(self.imported, self.rate)
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.imported / elapsed if elapsed else 0
+
+    def run(self, rows):
+        self.started = time.perf_counter()
+        batch = []
+        with explicit_dates():
+            for number, row in rows:
+                batch.append(self.build(number, row))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+        return self.imported
+
+    def refresh_derived(self):
+        """Пересчитывает то, что при bulk_create не обновили сигналы."""
+        stats.rebuild()
+        get_backend().rebuild()
+        slugs = Group.objects.filter(
+            pk__in=self.touched_groups).values_list('slug', flat=True)
+        usernames = User.objects.filter(
+            pk__in=self.touched_authors).values_list('username', flat=True)
+        invalidate_feeds(
+            'index', *(f'profile:{username}' for username in usernames),
+            *(f'group:{slug}' for slug in slugs))
+        counts.forget(
+            counts.feed_key(),
+            *(counts.feed_key(author_id=pk) for pk in self.touched_authors),
+            *(counts.feed_key(group_id=pk) for pk in self.touched_groups))
+        readers = set(Follow.objects.filter(
+            author_id__in=self.touched_authors).values_list(
+            'user_id', flat=True))
+        readers.update(Follow.objects.filter(
+            group_id__in=self.touched_groups).values_list(
+            'user_id', flat=True))
+        for user_id in readers | self.touched_authors:
+            tasks.rebuild_timeline.delay(user_id)
@@ -1,22 +1,38 @@
+from urllib.parse import urlencode
+
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 
+from users import profiles
+
+from . import tasks, timeline
+from .cache import (PageState, cache_feed_for_anonymous,
+                    conditional_on_feeds, feed_condition, invalidate_feeds)
 from .forms import PostForm
-from .models import Post, Group, User
+from .models import Follow, Post, Group, User
 from .constants import POST_PER_PAGE
+from .counts import feed_key
+from .feeds import feed_response
+from .paginators import CursorPaginator, FeedPaginator
+from .search import get_backend
 
 
-def paginator(posts, request):
-    paginator = Paginator(posts, POST_PER_PAGE)
+def paginator(posts, request, count_key=None):
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        return CursorPaginator(posts, POST_PER_PAGE).get_page(cursor)
+    paginator = FeedPaginator(posts, POST_PER_PAGE, count_key=count_key)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+@feed_condition('index')
+@cache_feed_for_anonymous('index')
 def index(request):
-    posts = Post.objects.select_related('author', 'group').all()
-    page_obj = paginator(posts, request)
+    posts = Post.objects.for_cards(with_group=True)
+    page_obj = paginator(posts, request, feed_key())
     context = {
         'page_obj': page_obj,
     }
@@ -24,32 +40,63 @@ def index(request):
     return render(request, template, context)
 
 
+@feed_condition('group')
+@cache_feed_for_anonymous('group')
 def group_list(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author').all()
-    page_obj = paginator(posts, request)
+    posts = group.posts.for_cards()
+    page_obj = paginator(posts, request, feed_key(group_id=group.pk))
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, group=group).exists()
     context = {
         'group': group,
         'page_obj': page_obj,
+        'following': following,
     }
     template = 'posts/group_list.html'
     return render(request, template, context)
 
 
+@feed_condition('profile')
+@cache_feed_for_anonymous('profile')
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    posts = user.posts.select_related('group').all()
-    page_obj = paginator(posts, request)
+    user = get_object_or_404(
+        User.objects.select_related('post_stats'), username=username)
+    posts = user.posts.for_cards()
+    page_obj = paginator(posts, request, feed_key(author_id=user.pk))
+    following = (
+        request.user.is_authenticated and request.user != user
+        and Follow.objects.filter(user=request.user, author=user).exists())
     context = {
         'profile': user,
+        # Имя считается один раз, а карточки страницы найдут его в LRU.
+        'author': profiles.from_user(user),
         'page_obj': page_obj,
+        'following': following,
     }
     template = 'posts/profile.html'
     return render(request, template, context)
 
 
+def post_detail_state(request, post_id):
+    """Версия поста и ленты автора и группы, показанные на его странице."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'version', 'modified', 'author__username', 'group__slug').first()
+    if row is None:
+        return None
+    version, modified, username, slug = row
+    feeds = [f'profile:{username}']
+    if slug:
+        feeds.append(f'group:{slug}')
+    return PageState(feeds, version, modified)
+
+
+@conditional_on_feeds(post_detail_state)
 def post_detail(request, post_id):
-    page_obj = get_object_or_404(Post, pk=post_id)
+    page_obj = get_object_or_404(
+        Post.objects.select_related(
+            'author__post_stats', 'group').defer('text'),
+        pk=post_id)
     context = {
         'page_obj': page_obj,
     }
@@ -72,7 +119,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     is_edit = True
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.select_related('author'), id=post_id)
     form = PostForm(request.POST or None,
                     instance=post)
     if request.user != post.author:
@@ -86,3 +133,106 @@ def post_edit(request, post_id):
     }
     template = 'posts/create_post.html'
     return render(request, template, context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = get_backend().filter(
+        Post.objects.for_cards(with_group=True), query)
+    page_obj = FeedPaginator(posts, POST_PER_PAGE).get_page(
+        request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    template = 'posts/search.html'
+    return render(request, template, context)
+
+
+# Лента проверяется условным GET до запросов к базе: опрос неизменившейся
+# ленты стоит только чтения поколения из кэша.
+@conditional_on_feeds(lambda request, fmt: PageState(['index']))
+def index_feed(request, fmt):
+    return feed_response(
+        request, fmt, 'Последние обновления на сайте',
+        reverse('posts:index'), Post.objects.all())
+
+
+@conditional_on_feeds(
+    lambda request, slug, fmt: PageState([f'group:{slug}']))
+def group_feed(request, slug, fmt):
+    group = get_object_or_404(Group.objects.only('title', 'slug'), slug=slug)
+    return feed_response(
+        request, fmt, group.title,
+        reverse('posts:group_list', kwargs={'slug': slug}),
+        Post.objects.filter(group_id=group.pk))
+
+
+@conditional_on_feeds(
+    lambda request, username, fmt: PageState([f'profile:{username}']))
+def profile_feed(request, username, fmt):
+    user = get_object_or_404(User.objects.only(
+        'username', 'first_name', 'last_name'), username=username)
+    return feed_response(
+        request, fmt, f'Записи пользователя {user.get_full_name() or user}',
+        reverse('posts:profile', kwargs={'username': username}),
+        Post.objects.filter(author_id=user.pk))
+
+
+@login_required
+def follow_index(request):
+    posts = timeline.timeline_posts(request.user).for_cards(
+        with_group=True)
+    page_obj = paginator(posts, request)
+    context = {
+        'page_obj': page_obj,
+    }
+    template = 'posts/follow.html'
+    return render(request, template, context)
+
+
+def _follows_changed(user, feed):
+    """Пересобирает ленту читателя и сбрасывает кэш кнопки подписки."""
+    tasks.rebuild_timeline.delay(user.pk)
+    invalidate_feeds(feed)
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        _, created = Follow.objects.get_or_create(
+            user=request.user, author=author)
+        if created:
+            _follows_changed(request.user, f'profile:{author.username}')
+    return redirect('posts:profile', username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author=author).delete()
+    if deleted:
+        _follows_changed(request.user, f'profile:{author.username}')
+    return redirect('posts:profile', username)
+
+
+@login_required
+def group_follow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    _, created = Follow.objects.get_or_create(user=request.user, group=group)
+    if created:
+        _follows_changed(request.user, f'group:{group.slug}')
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    deleted, _ = Follow.objects.filter(
+        user=request.user, group=group).delete()
+    if deleted:
+        _follows_changed(request.user, f'group:{group.slug}')
+    return redirect('posts:group_list', slug)
@@ -0,0 +1,110 @@
+import logging
+import multiprocessing
+import signal
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.queue import claim, requeue_stale, run_job
+
+logger = logging.getLogger('tasks')
+
+
+def _execute(pk):
+    try:
+        return run_job(pk)
+    except Exception:
+        logger.exception('Не удалось выполнить задачу %s', pk)
+        return False
+    finally:
+        # Потоки и процессы пула держат свои соединения, не копим их.
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS_WORKERS,
+            help='Размер пула; 0 — выполнять в основном потоке')
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread',
+            help='Пул потоков или процессов')
+        parser.add_argument(
+            '--poll', type=float, default=settings.TASKS_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.done = self.failed = 0
+        requeue_stale()
+        workers = options['workers']
+        if workers:
+            self.run_pool(workers, options)
+        else:
+            self.run_inline(options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено: {self.done}, с ошибкой: {self.failed}'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def count(self, succeeded):
+        if succeeded:
+            self.done += 1
+        else:
+            self.failed += 1
+
+    def run_inline(self, options):
+        while not self.stopping:
+            pks = claim(1)
+            if not pks:
+                if options['once']:
+                    return
+                requeue_stale()
+                time.sleep(options['poll'])
+            for pk in pks:
+                self.count(run_job(pk))
+
+    def run_pool(self, workers, options):
+        # Процессы пула стартуют при первом submit(), уже после claim():
+        # соединения родителя закрываются перед ним, чтобы дочерние
+        # процессы их не унаследовали.
+        fork_pending = options['pool'] == 'process'
+        if fork_pending:
+            executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('fork'))
+        else:
+            executor = ThreadPoolExecutor(
+                workers, thread_name_prefix='tasks')
+        in_flight = set()
+        with executor:
+            while not self.stopping or in_flight:
+                pks = []
+                if not self.stopping and len(in_flight) < workers:
+                    pks = claim(workers - len(in_flight))
+                if pks and fork_pending:
+                    connections.close_all()
+                    fork_pending = False
+                in_flight.update(executor.submit(_execute, pk) for pk in pks)
+                if in_flight:
+                    finished, in_flight = wait(
+                        in_flight, options['poll'],
+                        return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self.count(future.result())
+                elif options['once']:
+                    return
+                else:
+                    requeue_stale()
+                    time.sleep(options['poll'])
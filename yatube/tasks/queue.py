@@ -0,0 +1,104 @@
+"""Очередь фоновых задач в основной базе данных.
+
+Задача ставится в очередь в той же транзакции, что и изменения,
+которые её породили: откат транзакции отменяет и задачу, а воркер
+не увидит её раньше коммита. Выполняет задачи команда run_tasks.
+"""
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    """Зарегистрированная функция: вызов выполняет её, delay — ставит."""
+
+    def __init__(self, func, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args):
+        if settings.TASKS_ALWAYS_EAGER:
+            self.func(*args)
+            return None
+        return Job.objects.create(
+            name=self.name, args=json.dumps(args),
+            max_attempts=self.max_attempts)
+
+
+def task(func=None, *, max_attempts=5):
+    """Декоратор фоновой задачи; аргументы должны сериализоваться в JSON."""
+    def register(func):
+        registered = Task(func, max_attempts)
+        _registry[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
+
+
+def backoff(attempts):
+    """Задержка перед повтором: экспонента с потолком и разбросом."""
+    delay = min(settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1),
+                settings.TASKS_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, чей воркер, видимо, упал."""
+    deadline = timezone.now() - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=deadline).update(status=Job.QUEUED)
+
+
+def claim(limit):
+    """Забирает до limit готовых задач; безопасно для нескольких воркеров.
+
+    Задача достаётся тому, чей UPDATE со старым статусом сработал,
+    поэтому блокировки строк (которых нет в SQLite) не нужны.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now).order_by(
+        'run_at').values_list('pk', flat=True)[:limit]
+    return [
+        pk for pk in candidates
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1)
+    ]
+
+
+def run_job(pk):
+    """Выполняет взятую задачу; True при успехе."""
+    job = Job.objects.get(pk=pk)
+    try:
+        registered = _registry[job.name]
+        registered.func(*json.loads(job.args))
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            logger.warning('Задача %s упала, повтор: %s', job.name, error)
+            Job.objects.filter(pk=pk).update(
+                status=Job.QUEUED, last_error=error,
+                run_at=timezone.now() + backoff(job.attempts))
+        else:
+            logger.error('Задача %s упала окончательно: %s', job.name, error)
+            Job.objects.filter(pk=pk).update(
+                status=Job.FAILED, last_error=error)
+        return False
+    job.delete()
+    return True
@@ -0,0 +1,123 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tasks.models import Job
+from tasks.queue import claim, requeue_stale, run_job, task
+
+calls = []
+
+
+@task(max_attempts=2)
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError('Сбой')
+
+
+@task()
+def write_pid(path):
+    with open(path, 'a') as output:
+        output.write(f'{os.getpid()}\n')
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_enqueues_job(self):
+        """delay кладёт задачу в очередь, не выполняя её."""
+        job = remember.delay(1)
+        self.assertEqual(job.name, 'tasks.tests.remember')
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(calls, [])
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode_runs_immediately(self):
+        """В режиме TASKS_ALWAYS_EAGER задача выполняется сразу."""
+        self.assertIsNone(remember.delay(1))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_worker_runs_and_deletes_jobs(self):
+        """Воркер выполняет задачи и удаляет выполненные."""
+        remember.delay(1)
+        remember.delay(2)
+        output = StringIO()
+        call_command('run_tasks', '--workers', '0', '--once', stdout=output)
+        self.assertEqual(calls, [1, 2])
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('Выполнено: 2', output.getvalue())
+
+    def test_process_pool_runs_jobs(self):
+        """Пул процессов стартует после закрытия соединений родителя."""
+        events = []
+        command = 'tasks.management.commands.run_tasks'
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'pids')
+            write_pid.delay(path)
+            write_pid.delay(path)
+            output = StringIO()
+            with mock.patch(f'{command}.connections') as connections, \
+                    mock.patch(f'{command}.claim') as claimed:
+                connections.close_all.side_effect = (
+                    lambda: events.append('close'))
+                claimed.side_effect = (
+                    lambda size: events.append('claim') or claim(size))
+                call_command('run_tasks', '--pool', 'process',
+                             '--workers', '2', '--once', stdout=output)
+            with open(path) as pids:
+                pids = pids.read().split()
+        # Первый claim() открывает соединение, и только потом fork.
+        self.assertEqual(events[:2], ['claim', 'close'])
+        self.assertEqual(len(pids), 2)
+        self.assertNotIn(str(os.getpid()), pids)
+        self.assertIn('Выполнено: 2', output.getvalue())
+
+    def test_failed_job_retried_with_backoff(self):
+        """Упавшая задача возвращается в очередь с отсрочкой."""
+        job = explode.delay()
+        [pk] = claim(10)
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.assertFalse(run_job(pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Сбой', job.last_error)
+        self.assertEqual(claim(10), [])
+
+    def test_job_fails_after_max_attempts(self):
+        """После последней попытки задача помечается ошибочной."""
+        job = explode.delay()
+        for _ in range(job.max_attempts):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            [pk] = claim(10)
+            with self.assertLogs('tasks.queue', 'WARNING'):
+                run_job(pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_job_claimed_once(self):
+        """Одну задачу нельзя забрать дважды."""
+        remember.delay(1)
+        self.assertEqual(len(claim(10)), 1)
+        self.assertEqual(claim(10), [])
+
+    def test_stale_job_requeued(self):
+        """Задача упавшего воркера возвращается в очередь."""
+        job = remember.delay(1)
+        claim(10)
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(claim(10), [job.pk])
@@ -0,0 +1,173 @@
+"""Короткие профили авторов для лент: username и отображаемое имя.
+
+Профили лежат в LRU процесса и в общем кэше. Смена имени обновляет
+общий кэш и сдвигает поколение профилей: LRU других процессов
+сбрасывается при следующем обращении, поэтому устаревшее имя
+не переживает сохранение пользователя.
+
+Это верно только для общего кэша: с кэшем в памяти процесса
+(posts.cache.feed_cache_enabled() ложно) профили каждый раз
+читаются из базы одним запросом.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from posts.cache import feed_cache_enabled
+
+GENERATION_KEY = 'users:profiles:generation'
+PROFILE_FIELDS = ('pk', 'username', 'first_name', 'last_name')
+NAME_FIELDS = PROFILE_FIELDS[1:]
+
+
+class AuthorProfile(namedtuple('AuthorProfile', 'pk username display_name')):
+    __slots__ = ()
+
+    @classmethod
+    def from_values(cls, pk, username, first_name, last_name):
+        # Как AbstractUser.get_full_name, но без пустого имени.
+        full_name = f'{first_name} {last_name}'.strip()
+        return cls(pk, username, full_name or username)
+
+    def __str__(self):
+        return self.username
+
+
+class ProfileCache:
+    """LRU профилей одного процесса, привязанный к поколению в кэше."""
+
+    def __init__(self, size):
+        self.size = size
+        self.profiles = OrderedDict()
+        self.generation = None
+        self.lock = threading.Lock()
+
+    def sync(self, generation):
+        with self.lock:
+            if generation != self.generation:
+                self.profiles.clear()
+                self.generation = generation
+
+    def get_many(self, pks):
+        found = {}
+        with self.lock:
+            for pk in pks:
+                profile = self.profiles.get(pk)
+                if profile is not None:
+                    self.profiles.move_to_end(pk)
+                    found[pk] = profile
+        return found
+
+    def put_many(self, profiles):
+        with self.lock:
+            for profile in profiles:
+                self.profiles[profile.pk] = profile
+                self.profiles.move_to_end(profile.pk)
+            while len(self.profiles) > self.size:
+                self.profiles.popitem(last=False)
+
+    def discard(self, pk):
+        with self.lock:
+            self.profiles.pop(pk, None)
+
+
+local = ProfileCache(settings.AUTHOR_PROFILES_LRU_SIZE)
+
+
+def _cache_key(pk):
+    return f'users:profile:{pk}'
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Кэш очищен или ещё пуст: начинаем новое поколение, иначе LRU
+        # мог бы хранить профили, которых общий кэш уже не помнит.
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _load(pks):
+    return [
+        AuthorProfile.from_values(*row)
+        for row in get_user_model().objects.filter(
+            pk__in=pks).values_list(*PROFILE_FIELDS)
+    ]
+
+
+def get_many(pks):
+    """Профили по pk: LRU процесса, общий кэш, затем один запрос к базе."""
+    pks = set(pks)
+    if not pks:
+        return {}
+    if not feed_cache_enabled():
+        # Смену имени в другом процессе здесь не увидеть.
+        return {profile.pk: profile for profile in _load(pks)}
+    local.sync(_generation())
+    profiles = local.get_many(pks)
+    missing = pks - profiles.keys()
+    if missing:
+        shared = cache.get_many([_cache_key(pk) for pk in missing])
+        found = [AuthorProfile(*profile) for profile in shared.values()]
+        missing -= {profile.pk for profile in found}
+        if missing:
+            loaded = _load(missing)
+            cache.set_many(
+                {_cache_key(profile.pk): tuple(profile)
+                 for profile in loaded},
+                settings.AUTHOR_PROFILES_TIMEOUT)
+            found += loaded
+        local.put_many(found)
+        profiles.update((profile.pk, profile) for profile in found)
+    return profiles
+
+
+def from_user(user):
+    """Профиль уже загруженного пользователя; заодно кладётся в LRU."""
+    profile = AuthorProfile.from_values(
+        *(getattr(user, field) for field in PROFILE_FIELDS))
+    if feed_cache_enabled():
+        local.sync(_generation())
+        local.put_many([profile])
+    return profile
+
+
+def remember(user):
+    """Запоминает имя пользователя, чтобы refresh() заметил его смену."""
+    # Через __dict__, чтобы не подгружать отложенные поля.
+    values = [user.__dict__.get(field) for field in NAME_FIELDS]
+    user._loaded_names = None if None in values else (
+        AuthorProfile.from_values(None, *values)[1:])
+
+
+def refresh(user):
+    """Записывает свежий профиль и сбрасывает LRU всех процессов.
+
+    Возвращает False и ничего не трогает, если username и отображаемое
+    имя с загрузки пользователя не изменились.
+    """
+    profile = AuthorProfile.from_values(
+        *(getattr(user, field) for field in PROFILE_FIELDS))
+    if profile[1:] == getattr(user, '_loaded_names', None):
+        return False
+    cache.set(_cache_key(user.pk), tuple(profile),
+              settings.AUTHOR_PROFILES_TIMEOUT)
+    _bump_generation()
+    local.put_many([profile])
+    user._loaded_names = profile[1:]
+    return True
+
+
+def forget(pk):
+    cache.delete(_cache_key(pk))
+    _bump_generation()
+
+
+def _bump_generation():
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+    local.sync(cache.get(GENERATION_KEY))
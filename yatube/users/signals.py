@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init
+from django.dispatch import receiver
+
+from . import profiles
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=User)
+def remember_names(sender, instance, **kwargs):
+    """Смену имени при save() заметит posts.signals.author_saved."""
+    profiles.remember(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    profiles.forget(instance.pk)
@@ -1,8 +1,14 @@
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
 from http import HTTPStatus
 from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
 
+from core.query_budget import QueryBudgetMixin
+from users import profiles
 from users.forms import CreatingForm
 
 User = get_user_model()
@@ -78,3 +84,107 @@ class UsersCreateFormTests(TestCase):
             follow=True
         )
         self.assertEqual(User.objects.count(), user_count + 1)
+
+
+class AuthorProfilesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', first_name='Имя', last_name='Фамилия')
+        cls.nameless = User.objects.create(username='nameless')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bulk_load_then_local_cache(self):
+        """Профили грузятся одним запросом, повторно — из LRU."""
+        with self.assertNumQueries(1):
+            found = profiles.get_many([self.author.pk, self.nameless.pk])
+        self.assertEqual(found[self.author.pk].display_name, 'Имя Фамилия')
+        self.assertEqual(found[self.nameless.pk].display_name, 'nameless')
+        with self.assertNumQueries(0):
+            profiles.get_many([self.author.pk])
+
+    def test_rename_refreshes_profile(self):
+        """Сохранение нового имени сразу видно без запроса к базе."""
+        profiles.get_many([self.author.pk])
+        self.author.first_name = 'Другое'
+        self.author.save()
+        with self.assertNumQueries(0):
+            found = profiles.get_many([self.author.pk])
+        self.assertEqual(found[self.author.pk].display_name, 'Другое Фамилия')
+
+    def test_new_generation_drops_local_profiles(self):
+        """Поколение, сдвинутое другим процессом, сбрасывает LRU."""
+        profiles.get_many([self.author.pk])
+        profiles.local.put_many(
+            [profiles.AuthorProfile(self.author.pk, 'author', 'Старое')])
+        cache.set(profiles.GENERATION_KEY, 'другой процесс')
+        found = profiles.get_many([self.author.pk])
+        self.assertEqual(found[self.author.pk].display_name, 'Имя Фамилия')
+
+    @override_settings(FEED_CACHE_REQUIRE_SHARED=True)
+    def test_process_local_cache_skips_lru(self):
+        """С кэшем в памяти процесса профили читаются из базы."""
+        profiles.get_many([self.author.pk])
+        User.objects.filter(pk=self.author.pk).update(first_name='Другое')
+        with self.assertNumQueries(1):
+            found = profiles.get_many([self.author.pk])
+        self.assertEqual(found[self.author.pk].display_name, 'Другое Фамилия')
+
+    def test_login_keeps_generation(self):
+        """Сохранение без смены имени не сбрасывает профили."""
+        profiles.get_many([self.author.pk])
+        generation = cache.get(profiles.GENERATION_KEY)
+        self.client.force_login(self.author)
+        self.assertEqual(cache.get(profiles.GENERATION_KEY), generation)
+
+    def test_unchanged_name_keeps_generation(self):
+        """Новый пользователь и то же имя не сбрасывают профили."""
+        profiles.get_many([self.author.pk])
+        generation = cache.get(profiles.GENERATION_KEY)
+        User.objects.create(username='newcomer')
+        author = User.objects.get(pk=self.author.pk)
+        author.save()
+        self.assertEqual(cache.get(profiles.GENERATION_KEY), generation)
+        author.username = 'renamed'
+        author.save()
+        self.assertNotEqual(cache.get(profiles.GENERATION_KEY), generation)
+
+
+class UsersQueryBudgetTest(QueryBudgetMixin, TestCase):
+    # Для авторизованного пользователя: сессия и пользователь — 2 запроса.
+    budgets = {
+        'users:signup': 2,
+        'users:login': 2,
+        'users:logout': 4,
+        'users:password_change_form': 2,
+        'users:password_change_done': 2,
+        'users:password_reset_form': 2,
+        'users:password_reset_done': 2,
+        'users:password_reset_confirm': 5,
+        'users:password_reset_complete': 2,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create(username='TestUser')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_every_route_has_budget(self):
+        """У каждого маршрута users есть бюджет запросов."""
+        self.assertBudgetsCoverRoutes('users.urls', self.budgets)
+
+    def test_budgets(self):
+        """Страницы users укладываются в бюджет запросов."""
+        confirm_kwargs = {
+            'uidb64': urlsafe_base64_encode(force_bytes(self.user.pk)),
+            'token': default_token_generator.make_token(self.user),
+        }
+        for name, budget in self.budgets.items():
+            kwargs = confirm_kwargs if name.endswith('confirm') else {}
+            with self.subTest(name=name):
+                client = Client()
+                client.force_login(self.user)
+                self.assertPageWithinBudget(
+                    client, reverse(name, kwargs=kwargs), budget)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -29,9 +30,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'tasks.apps.TasksConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +66,20 @@ TEMPLATES = [
     },
 ]
 
+# Кэш скомпилированных шаблонов: каждый шаблон разбирается один раз
+# на процесс, а при запуске core прогревает все шаблоны из TEMPLATES_DIR.
+# Включён без DEBUG или с YATUBE_TEMPLATE_CACHE=1.
+TEMPLATE_CACHE = not DEBUG or os.environ.get('YATUBE_TEMPLATE_CACHE') == '1'
+if TEMPLATE_CACHE:
+    # Явные loaders несовместимы с APP_DIRS.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -71,8 +89,148 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get(
+            'YATUBE_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+    }
+}
+
+# Профиль SQLite для нескольких воркеров WSGI (YATUBE_SQLITE_PROFILE=production):
+# WAL, чтобы писатель не блокировал читателей, ожидание блокировки вместо
+# ошибки «database is locked» и постоянные соединения. Прагмы выполняются
+# на каждом новом соединении (core.sqlite.apply_pragmas).
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    # В WAL режим normal не теряет целостность, только последние коммиты
+    # при отключении питания.
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ: 64 МиБ на соединение.
+    'cache_size': -64000,
+    'temp_store': 'memory',
+}
+if os.environ.get('YATUBE_SQLITE_PROFILE') == 'production':
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+else:
+    SQLITE_PRAGMAS = {}
+
+# Реплики для чтения: YATUBE_DB_REPLICAS — пути к копиям базы через запятую.
+# Для SQLite копии обновляет команда sync_replicas. В тестах реплики
+# смотрят в тестовую основную базу.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи клиент читает только основную базу.
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# По умолчанию кэш в памяти процесса; YATUBE_CACHE_DIR включает файловый кэш,
+# общий для всех воркеров.
+if os.environ.get('YATUBE_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['YATUBE_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
+
+# Поколения лент (posts.cache) задают ETag и ключи кэша страниц и должны
+# быть общими для всех воркеров. Без DEBUG кэш в памяти процесса
+# отключает кэш страниц и условный GET (и даёт предупреждение posts.W001).
+FEED_CACHE_REQUIRE_SHARED = not DEBUG
+
+
+# Очередь фоновых задач (tasks): индексация поиска, ленты подписок.
+# Выполняет их команда run_tasks; TASKS_ALWAYS_EAGER выполняет задачи
+# сразу при постановке, без очереди.
+TASKS_ALWAYS_EAGER = os.environ.get('YATUBE_TASKS_EAGER') == '1'
+TASKS_WORKERS = 4
+TASKS_POLL_INTERVAL = 1
+# Повтор через TASKS_RETRY_BACKOFF * 2^(попытка - 1) секунд, не дольше часа.
+TASKS_RETRY_BACKOFF = 10
+TASKS_RETRY_BACKOFF_MAX = 60 * 60
+# Задача, которая выполняется дольше, считается брошенной упавшим воркером.
+TASKS_LOCK_TIMEOUT = 60 * 5
+
+
+# Профили авторов для лент (users.profiles): LRU в каждом процессе
+# и общий кэш. Смена имени сбрасывает LRU всех процессов.
+AUTHOR_PROFILES_LRU_SIZE = 4096
+AUTHOR_PROFILES_TIMEOUT = 60 * 60 * 24
+
+
+# Замеры производительности запросов (core.middleware.PerformanceMiddleware).
+# Каждый процесс периодически сохраняет гистограммы вьюх в свой файл
+# в PERFORMANCE_STATS_DIR, команда performance_stats их объединяет.
+PERFORMANCE_STATS_DIR = os.environ.get(
+    'YATUBE_PERFORMANCE_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube_performance'),
+)
+PERFORMANCE_FLUSH_INTERVAL = 30
+# Файлы процессов, не обновлявшиеся дольше, performance_stats удаляет.
+PERFORMANCE_STATS_MAX_AGE = 60 * 60
+# Тесты сохраняют замеры во временный каталог.
+TEST_RUNNER = 'core.test_runner.TemporaryStatsRunner'
+# Запросы дольше порога пишутся в лог с уровнем WARNING, остальные — INFO.
+PERFORMANCE_SLOW_REQUEST_MS = 500
+# Профиль шаблонов (YATUBE_TEMPLATE_PROFILING=1): время каждого шаблона
+# и include в логе запроса, самые долгие — в Server-Timing; суммы по
+# процессу выводит performance_stats --templates.
+TEMPLATE_PROFILING = os.environ.get('YATUBE_TEMPLATE_PROFILING') == '1'
+TEMPLATE_PROFILING_TOP = 5
+
+# Журнал медленных SQL-запросов (core.slow_queries), по умолчанию выключен.
+# YATUBE_SLOW_QUERY_MS задаёт порог в миллисекундах; команда slow_queries
+# сводит журнал по нормализованным запросам.
+SLOW_QUERY_THRESHOLD_MS = (
+    float(os.environ['YATUBE_SLOW_QUERY_MS'])
+    if os.environ.get('YATUBE_SLOW_QUERY_MS') else None
+)
+SLOW_QUERY_LOG_FILE = os.path.join(PERFORMANCE_STATS_DIR, 'slow_queries.jsonl')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        # Ошибки доставки и счётчики очереди писем при остановке процесса.
+        'core.mail': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_MAIL_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
 
 
@@ -121,8 +279,14 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts.index'
 
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь и доставляются фоновым потоком (core.mail)
+# через движок filebased.EmailBackend
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+QUEUED_EMAIL_BATCH_SIZE = 50
+# Сколько секунд добирать пачку после первого письма
+QUEUED_EMAIL_BATCH_WAIT = 0.2
+QUEUED_EMAIL_DRAIN_TIMEOUT = 30
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 